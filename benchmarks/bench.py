@@ -0,0 +1,215 @@
+"""オフラインのベンチマーク（実サイトには一切アクセスしない）
+
+stub_server.StubJRA を起動し、JRA_BASE_URL をそこへ向けてから
+探索・取得・解析・Excel保存の各段階を1件ずつ計測する。
+
+    python benchmarks/bench.py                           # 3場×土日（72レース）
+    python benchmarks/bench.py --latency 0.03 --jitter 0.02
+    python benchmarks/bench.py --json before.json        # 結果を保存
+    python benchmarks/bench.py --compare before.json     # 前回との差を表示
+
+段階ごとに 件数・件/秒・p50/p95/最大（ms）・ピークメモリ（tracemalloc）を出す。
+キャッシュ類は一時フォルダに作るので、毎回まっさらな状態から測る。
+"""
+import argparse, json, os, platform, sys, tempfile, time, tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import StubJRA, default_weekend
+
+VENUE_ORDER = ("東京", "京都", "福島", "新潟", "中山", "阪神")
+
+def percentile(values, p: float) -> float:
+    """最近傍順位法のパーセンタイル"""
+    if not values:
+        return 0.0
+    s = sorted(values)
+    k = max(0, min(len(s) - 1, int(round(p / 100 * len(s) + 0.5)) - 1))
+    return s[k]
+
+class Stage:
+    """1段階分の計測。with Stage(...) as st: の中で st.call(関数, 引数...) を1件ずつ呼ぶ"""
+
+    def __init__(self, name: str, trace_mem: bool):
+        self.name = name
+        self.trace_mem = trace_mem
+        self.samples = []
+        self.wall = 0.0
+        self.peak = 0
+
+    def __enter__(self):
+        if self.trace_mem:
+            tracemalloc.reset_peak()
+            self._base = tracemalloc.get_traced_memory()[0]
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall = time.perf_counter() - self._t0
+        if self.trace_mem:
+            self.peak = max(0, tracemalloc.get_traced_memory()[1] - self._base)
+
+    def call(self, fn, *args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.samples.append(time.perf_counter() - t0)
+
+    def result(self) -> dict:
+        ms = [s * 1000 for s in self.samples]
+        return {
+            "n": len(ms),
+            "wall_sec": round(self.wall, 3),
+            "ops_per_sec": round(len(ms) / self.wall, 1) if self.wall else 0.0,
+            "p50_ms": round(percentile(ms, 50), 2),
+            "p95_ms": round(percentile(ms, 95), 2),
+            "max_ms": round(max(ms), 2) if ms else 0.0,
+            "peak_mem_kb": round(self.peak / 1024, 1) if self.trace_mem else None,
+        }
+
+def unthrottle(base_url: str, rps: float):
+    """スタブ宛ての流量制御を rps に固定する（0 なら実質無制限）"""
+    from jra_excel_maker import ratelimit
+    rate = rps or 1e9
+    ratelimit.RATE_LIMIT_MAX_RPS = max(ratelimit.RATE_LIMIT_MAX_RPS, rate)
+    sched = ratelimit.get_rate_limiter().host(base_url)
+    sched.rate = rate
+    sched.burst = max(sched.burst, int(min(rate, 1e6)))
+    sched._tokens = float(sched.burst)
+    if not rps:
+        sched.concurrency = 1_000
+
+def run(args) -> dict:
+    stub = StubJRA(default_weekend(args.start, args.days, VENUE_ORDER[:args.venues]),
+                   races=args.races, field=args.field, latency=args.latency, jitter=args.jitter)
+    base_url = stub.start()
+    data_dir = tempfile.TemporaryDirectory(prefix="jra_bench_data_")
+    out_dir = tempfile.TemporaryDirectory(prefix="jra_bench_out_")
+    # jra_excel_maker は設定を読み込み時に決めるので、import より先に環境変数を入れる
+    os.environ["JRA_BASE_URL"] = base_url
+    os.environ["JRA_DATA_DIR"] = data_dir.name
+
+    from jra_excel_maker.discovery import build_jra_url_and_soup, try_fetch
+    from jra_excel_maker.parse import fetch_rows_and_meta
+    from jra_excel_maker.excel import save_to_desktop, save_batch_to_desktop
+
+    unthrottle(base_url, args.rps)
+    races = stub.card_urls()
+    # 外れURL: 実在するCNAMEのサフィックスだけ変えたもの（推測戦略の大半はこれ）
+    misses = [u[:-2] + f"{i:02X}" for i in range(256) for *_, u in races if u[-2:] != f"{i:02X}"][:args.probes]
+    stages = {}
+
+    def stage(name):
+        stages[name] = Stage(name, not args.no_mem)
+        return stages[name]
+
+    if not args.no_mem:
+        tracemalloc.start()
+    try:
+        # 探索（初回）: 開催一覧を1回取得し、以降はインデックスから1回の取得で見つかる
+        found = {}
+        with stage("discover_cold") as st:
+            for ymd, place, r, _ in races:
+                found[(ymd, place, r)] = st.call(build_jra_url_and_soup, ymd, place, r)
+
+        # 探索（未掲載）: 一覧に載っていない日付。全戦略が404を並列に試す
+        with stage("discover_unlisted") as st:
+            for i in range(args.unlisted):
+                st.call(build_jra_url_and_soup, "20251101", VENUE_ORDER[i % args.venues], 11)
+
+        # try_fetch: 出馬表（304再検証＋解析）と外れURL（404）
+        with stage("try_fetch_card") as st:
+            for *_, url in races:
+                st.call(try_fetch, url)
+        with stage("try_fetch_404") as st:
+            for url in misses:
+                st.call(try_fetch, url)
+
+        # 取得＋解析（soup なし: 条件付きGET → デコード → 解析 → 抽出）
+        cards = []
+        with stage("fetch_rows_and_meta") as st:
+            for (ymd, place, r), (url, _) in found.items():
+                if url:
+                    rows, filename, title, _ = st.call(fetch_rows_and_meta, url)
+                    cards.append((f"{ymd}_{place}_{r}R", rows, filename, title))
+
+        # 探索（2回目）: URLキャッシュと解析結果キャッシュで取得なしに返る
+        with stage("discover_warm") as st:
+            for ymd, place, r, _ in races:
+                st.call(build_jra_url_and_soup, ymd, place, r)
+
+        with stage("save_to_desktop") as st:
+            for _, rows, filename, title in cards:
+                st.call(save_to_desktop, rows, filename, title, out_dir.name)
+        with stage("save_batch_to_desktop") as st:
+            st.call(save_batch_to_desktop, [(name, rows, title) for name, rows, _, title in cards],
+                    "bench_全レース.xlsx", out_dir.name)
+    finally:
+        if not args.no_mem:
+            tracemalloc.stop()
+        stub.stop()
+        data_dir.cleanup()
+        out_dir.cleanup()
+
+    return {
+        "meta": {
+            "venues": args.venues, "days": args.days, "races": len(races), "field": args.field,
+            "latency": args.latency, "jitter": args.jitter, "rps": args.rps,
+            "found": sum(1 for url, _ in found.values() if url),
+            "python": platform.python_version(), "platform": platform.platform(),
+            "ts": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "stages": {name: st.result() for name, st in stages.items()},
+        "stub_hits": dict(stub.hits),
+    }
+
+def print_table(result: dict, previous: dict | None = None):
+    meta = result["meta"]
+    print(f"{meta['venues']}場×{meta['days']}日 {meta['races']}レース（{meta['field']}頭立て）"
+          f" 遅延{meta['latency']}s  見つかった {meta['found']}件  Python {meta['python']}")
+    print(f"{'段階':24} {'件数':>5} {'件/秒':>9} {'p50ms':>9} {'p95ms':>9} {'最大ms':>9} {'ピークKB':>10}")
+    for name, s in result["stages"].items():
+        mem = f"{s['peak_mem_kb']:10.1f}" if s["peak_mem_kb"] is not None else f"{'-':>10}"
+        print(f"{name:24} {s['n']:5d} {s['ops_per_sec']:9.1f} {s['p50_ms']:9.2f} {s['p95_ms']:9.2f} {s['max_ms']:9.2f} {mem}")
+        old = (previous or {}).get("stages", {}).get(name)
+        if old:
+            def delta(key):
+                a, b = old.get(key), s.get(key)
+                return f"{(b - a) / a * 100:+8.1f}%" if a and b is not None else f"{'-':>9}"
+            print(f"{'  前回比':22} {'':5} {delta('ops_per_sec'):>9} {delta('p50_ms'):>9} {delta('p95_ms'):>9} "
+                  f"{delta('max_ms'):>9} {delta('peak_mem_kb'):>10}")
+    print("スタブへのリクエスト: " + " / ".join(f"{k} {v}" for k, v in sorted(result["stub_hits"].items())))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="出馬表取得のオフラインベンチマーク")
+    ap.add_argument("--venues", type=int, default=3, help="開催場数（1〜6）")
+    ap.add_argument("--days", type=int, default=2, help="開催日数（土日=2）")
+    ap.add_argument("--start", default="20251108", help="開催初日 YYYYMMDD")
+    ap.add_argument("--races", type=int, default=12, help="1開催あたりのレース数")
+    ap.add_argument("--field", type=int, default=18, help="1レースの頭数")
+    ap.add_argument("--latency", type=float, default=0.0, help="スタブの応答遅延（秒）")
+    ap.add_argument("--jitter", type=float, default=0.0, help="遅延に足すばらつきの上限（秒）")
+    ap.add_argument("--rps", type=float, default=0, help="流量制御の上限（0=制限なし、8=本番と同じ開始値）")
+    ap.add_argument("--unlisted", type=int, default=2, help="一覧に載っていないレースの探索回数（全戦略が走る）")
+    ap.add_argument("--probes", type=int, default=200, help="try_fetch_404 で試す外れURLの数")
+    ap.add_argument("--no-mem", action="store_true", help="tracemalloc を使わない（計測の上乗せをなくす）")
+    ap.add_argument("--json", metavar="PATH", help="結果をJSONで保存")
+    ap.add_argument("--compare", metavar="PATH", help="前回のJSONと比べる")
+    args = ap.parse_args(argv)
+    args.venues = max(1, min(len(VENUE_ORDER), args.venues))
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+
+    result = run(args)
+    print_table(result, previous)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""ベンチマーク用のJRAスタブサーバー
+
+fixtures/ の出馬表・開催一覧・404ページを、指定した遅延つきで返す。
+実サイトには一切アクセスしない。単体でも起動できる:
+
+    python benchmarks/stub_server.py --port 8765 --latency 0.05
+    set JRA_BASE_URL=http://127.0.0.1:8765   （jra_excel_maker をこのサーバーへ向ける）
+
+出馬表は ETag を付けて返し、If-None-Match が一致すれば 304 を返す。
+"""
+import argparse, hashlib, os, random, threading, time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+ENCODING = "cp932"   # JRAと同じく Shift_JIS で返す
+
+VENUE_CODE = {
+    "札幌":"01","函館":"02","福島":"03","新潟":"04",
+    "東京":"05","中山":"06","中京":"07","京都":"08",
+    "阪神":"09","小倉":"10",
+}
+WEEKDAYS = "月火水木金土日"
+KANA = "アイカキクサシタチナニハヒマミヤユラリワン"
+JOCKEYS = ["ルメール", "川田将雅", "武豊", "戸崎圭太", "横山武史", "松山弘平", "坂井瑠星", "岩田望来", "鮫島克駿",
+           "西村淳也", "菅原明良", "丹内祐次", "津村明秀", "三浦皇成", "北村友一", "田辺裕信", "幸英明", "浜中俊"]
+
+def _fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+def default_weekend(start: str = "20251108", days: int = 2, venues=("東京", "京都", "福島")) -> list:
+    """(開催日, 場所, 回, 日) の一覧。既定は3場・土日の1週分"""
+    d0 = datetime.strptime(start, "%Y%m%d")
+    return [((d0 + timedelta(days=i)).strftime("%Y%m%d"), place, 3 + j, 1 + i)
+            for i in range(days) for j, place in enumerate(venues)]
+
+def _suffix(key: str) -> str:
+    return hashlib.md5(key.encode()).hexdigest()[:2].upper()
+
+class StubJRA:
+    """
+    fixtures から組み立てたページを返すローカルHTTPサーバー。
+    meetings: default_weekend() と同じ形の開催一覧。1開催あたり races レース。
+    latency / jitter: 1リクエストごとに足す待ち時間（秒）
+    """
+
+    def __init__(self, meetings=None, races: int = 12, field: int = 18,
+                 latency: float = 0.0, jitter: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.meetings = meetings or default_weekend()
+        self.races = races
+        self.field = field
+        self.latency = latency
+        self.jitter = jitter
+        self.hits = Counter()
+        self._lock = threading.Lock()
+        self._card_tpl = _fixture("card.html")
+        self._listing_tpl = _fixture("listing.html")
+        self._notfound = _fixture("notfound.html").encode(ENCODING)
+        self._cards = {}      # CNAME → (開催日, 場所, 回, 日, R)
+        for ymd, place, kai, nichi in self.meetings:
+            for r in range(1, races + 1):
+                prefix = f"pw01dde01{VENUE_CODE[place]}{ymd[:4]}{kai:02d}{nichi:02d}{r:02d}{ymd}"
+                self._cards[f"{prefix}/{_suffix(prefix)}"] = (ymd, place, kai, nichi, r)
+        self._pages = {}      # パス → 組み立て済みのバイト列
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    # ---------------- ページの組み立て ----------------
+    @staticmethod
+    def card_path(cname: str) -> str:
+        return f"/JRADB/accessD.html?CNAME={cname}"
+
+    def card_urls(self) -> list:
+        """(開催日, 場所, R, URL) の一覧"""
+        return [(ymd, place, r, self.base_url + self.card_path(c)) for c, (ymd, place, _, _, r) in self._cards.items()]
+
+    def _render_card(self, ymd, place, kai, nichi, race_no) -> str:
+        d = datetime.strptime(ymd, "%Y%m%d")
+        date_line = f"{d.year}年{d.month}月{d.day}日（{WEEKDAYS[d.weekday()]}曜） {kai}回{place}{nichi}日"
+        nav = "\n    ".join(f'<li><a href="#">{r}R</a></li>' for r in range(1, self.races + 1))
+        head, rest = self._card_tpl.split("<!--ROW-->", 1)
+        row_tpl, tail = rest.split("<!--/ROW-->", 1)
+        rnd = random.Random(f"{ymd}{place}{race_no}")
+        rows = []
+        for n in range(1, self.field + 1):
+            horse = "".join(rnd.choice(KANA) for _ in range(rnd.randint(4, 8)))
+            if n % 7 == 0:
+                horse += "（外）"
+            rows.append(row_tpl
+                        .replace("%%WAKU%%", str((n - 1) * 8 // self.field + 1))
+                        .replace("%%UMABAN%%", str(n))
+                        .replace("%%HORSE%%", horse)
+                        .replace("%%HORSE_ID%%", f"{2020000000 + rnd.randint(0, 999999)}")
+                        .replace("%%JOCKEY%%", rnd.choice(JOCKEYS))
+                        .replace("%%JOCKEY_ID%%", f"{rnd.randint(1000, 1999)}")
+                        .replace("%%SUFFIX%%", f"{rnd.randint(0, 255):02X}"))
+        html = head + "".join(rows) + tail
+        return (html.replace("%%DATE_LINE%%", date_line)
+                    .replace("%%PLACE%%", place)
+                    .replace("%%RACE%%", str(race_no))
+                    .replace("%%RACE_NAME%%", f"サンプル{place}特別" if race_no >= 9 else f"{race_no}競走")
+                    .replace("%%RACE_NAV%%", nav))
+
+    def _render_listing(self, only_date: str | None = None) -> str:
+        days = []
+        for ymd, place, kai, nichi in self.meetings:
+            if only_date and ymd != only_date:
+                continue
+            items = []
+            for cname, (d, p, k, n, r) in self._cards.items():
+                if (d, p, k, n) != (ymd, place, kai, nichi):
+                    continue
+                # 実サイトと同じく href と onclick(doAction) の両方が混在する
+                if r % 2:
+                    items.append(f'<li><a href="{self.card_path(cname)}">{r}R</a></li>')
+                else:
+                    items.append(f'<li><a href="#" onclick="return doAction(\'/JRADB/accessD.html\', \'{cname}\');">{r}R</a></li>')
+            days.append(f'  <div class="kaisai_unit"><h3>{kai}回{place}{nichi}日</h3><ul>{"".join(items)}</ul></div>')
+        return self._listing_tpl.replace("%%DAYS%%", "\n".join(days))
+
+    def _page(self, path: str):
+        """(ステータス, 種別, バイト列)"""
+        if path in self._pages:
+            return self._pages[path]
+        parts = urlsplit(path)
+        page = (404, "404", self._notfound)
+        if parts.path.startswith("/JRADB/access"):
+            cname = (parse_qs(parts.query).get("CNAME") or [""])[0]
+            if cname in self._cards and parts.path == "/JRADB/accessD.html":
+                page = (200, "card", self._render_card(*self._cards[cname]).encode(ENCODING))
+        elif parts.path == "/keiba/thisweek/":
+            page = (200, "listing", self._render_listing().encode(ENCODING))
+        elif parts.path.startswith("/keiba/thisweek/"):
+            ymd = parts.path.strip("/").rsplit("/", 1)[-1]
+            if any(m[0] == ymd for m in self.meetings):
+                page = (200, "listing", self._render_listing(ymd).encode(ENCODING))
+        elif parts.path == "/":
+            page = (200, "listing", self._listing_tpl.replace("%%DAYS%%", "").encode(ENCODING))
+        # 候補URLは数が多いので 404 はキャッシュしない
+        if page[0] == 200:
+            with self._lock:
+                self._pages[path] = page
+        return page
+
+    # ---------------- サーバー ----------------
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            wbufsize = -1   # ヘッダーと本文を1回で送る（分けると遅延ACKで約40ms待たされる）
+
+            def do_GET(self):
+                if stub.latency or stub.jitter:
+                    time.sleep(stub.latency + random.uniform(0, stub.jitter))
+                status, kind, body = stub._page(self.path)
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                if status == 200 and self.headers.get("If-None-Match") == etag:
+                    status, kind, body = 304, "304", b""
+                with stub._lock:
+                    stub.hits[kind] += 1
+                self.send_response(status)
+                if status in (200, 304):
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="JRAスタブサーバー（ベンチマーク用）")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", type=float, default=0.0, help="1リクエストごとの遅延（秒）")
+    ap.add_argument("--jitter", type=float, default=0.0, help="遅延に足すばらつきの上限（秒）")
+    ap.add_argument("--start", default="20251108", help="開催初日 YYYYMMDD")
+    ap.add_argument("--days", type=int, default=2)
+    ap.add_argument("--venues", type=int, default=3, help="開催場数（東京・京都・福島・…の順）")
+    args = ap.parse_args(argv)
+    venues = ("東京", "京都", "福島", "新潟", "中山", "阪神")[:args.venues]
+    stub = StubJRA(default_weekend(args.start, args.days, venues), latency=args.latency,
+                   jitter=args.jitter, port=args.port)
+    print(f"JRA_BASE_URL={stub.base_url}  （{len(stub.card_urls())}レース）", flush=True)
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
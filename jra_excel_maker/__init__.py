@@ -0,0 +1,6 @@
+"""JRA出馬表 取り込みツール（GUI・CLI 共通の本体）
+
+重いモジュール（bs4 / openpyxl / tkinter）はここでは読み込まない。
+必要なサブモジュールを直接 import すること。
+"""
+__version__ = "0.14"
@@ -0,0 +1,8 @@
+import multiprocessing, sys
+
+from .cli import main
+
+if __name__ == "__main__":
+    # 解析プロセス（spawn）が exe・python -m のどちらからでも起動できるように
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""過去の開催をまとめて取り込む（中断しても続きから再開できる）
+
+開催日×場所 を1単位として並列に処理し、1Rから順に探索・解析して
+1レースごとに JSON Lines へ追記する。1レース終わるたびにチェックポイント
+（JSON）を保存するので、中断後に同じ出力先で実行すれば続きから始まる。
+1Rが見つからない開催日×場所は未開催とみなして残りのRを飛ばす。過去の開催は一覧に
+載らず推測で探すしかないので、1Rの探索は BACKFILL_FIRST_RACE_BUDGETS の予算で打ち切る。
+予算内で見つからなかっただけのこともあるので、"skipped" は retry_skipped（--retry-skipped）で取り直せる。
+ただしサイトにつながらないときは未開催と区別できないので、記録せずに中断する。
+"""
+import json, os, threading, time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+from .config import VENUES, BATCH_WORKERS, BACKFILL_FIRST_RACE_BUDGETS
+from .discovery import get_url_cache, site_reachable
+from .pipeline import CardNotFound, CardPipeline
+from .sinks import JsonlSink, RaceKey
+
+RACES_PER_DAY = 12
+
+class Checkpoint:
+    """
+    開催日×場所 ごとの進み具合（次に取るR・状態）と失敗したレースを持つ。
+    状態: "running"（途中）/ "done"（12Rまで終了）/ "skipped"（1Rが見つからず未開催とみなした）
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.days = {}
+        self.failed = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.days = data.get("days", {})
+            self.failed = data.get("failed", {})
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def _key(yyyymmdd: str, place: str) -> str:
+        return f"{yyyymmdd}_{place}"
+
+    def day(self, yyyymmdd: str, place: str) -> dict:
+        with self._lock:
+            return dict(self.days.get(self._key(yyyymmdd, place), {"next": 1, "state": "running"}))
+
+    def advance(self, yyyymmdd: str, place: str, race_no: int, state: str = "running", error: str | None = None):
+        """race_no まで終わったことを記録して保存する"""
+        with self._lock:
+            nxt = race_no + 1
+            if state == "running" and nxt > RACES_PER_DAY:
+                state = "done"
+            self.days[self._key(yyyymmdd, place)] = {"next": nxt, "state": state}
+            if error:
+                self.failed[f"{yyyymmdd}_{place}_{race_no}"] = error
+            self._save()
+
+    def reset(self, yyyymmdd: str, place: str):
+        """1Rから取り直す（"skipped" の再試行用）"""
+        with self._lock:
+            self.days[self._key(yyyymmdd, place)] = {"next": 1, "state": "running"}
+            self._save()
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"days": self.days, "failed": self.failed}, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+def backfill_dates(dates, weekdays: bool = False) -> list:
+    """JRAの開催は土日が中心なので、既定では土日だけに絞る"""
+    return [d for d in dates if weekdays or datetime.strptime(d, "%Y%m%d").weekday() >= 5]
+
+def run_backfill(dates, out_path: str, places=VENUES, checkpoint_path: str | None = None,
+                 workers: int = BATCH_WORKERS, status_cb=None, debug_log=None,
+                 stop: threading.Event | None = None, retry_skipped: bool = False) -> dict:
+    """
+    dates×places の全レースを out_path（JSON Lines）へ書き出す。
+    stop をセットすると各ワーカーは今のレースを終えたところで止まる（続きは次回）。
+    retry_skipped なら、前回までに未開催とみなした開催日×場所も1Rから探し直す。
+    """
+    checkpoint = Checkpoint(checkpoint_path or out_path + ".checkpoint.json")
+    writer = JsonlSink(out_path, resume=True)
+    stop = stop or threading.Event()
+    stats = {"ok": 0, "missing": 0, "failed": 0, "skipped_days": 0, "rows": 0, "deferred": 0}
+    stats_lock = threading.Lock()
+    started = time.perf_counter()
+
+    units = [(ymd, place) for ymd in dates for place in places]
+    if retry_skipped:
+        for u in units:
+            if checkpoint.day(*u)["state"] == "skipped":
+                checkpoint.reset(*u)
+                get_url_cache().evict(*u, 1)   # 前回の「見つからなかった」で探索が省略されないように
+    todo = [u for u in units if checkpoint.day(*u)["state"] == "running"]
+    if debug_log:
+        debug_log(f"過去データ取り込み: {len(units)}開催日×場所のうち残り {len(todo)}件")
+
+    def bump(key, n=1):
+        with stats_lock:
+            stats[key] += n
+
+    def halt_offline():
+        if not stop.is_set():
+            stop.set()
+            if debug_log:
+                debug_log("JRAのサイトにつながらないため中断します（次回は続きから再開します）")
+
+    def unreachable() -> bool:
+        """サイトにつながらなければ、このレースを記録せずに全体を止める（次回はこのRから）"""
+        if site_reachable():
+            return False
+        bump("deferred")
+        halt_offline()
+        return True
+
+    def do_day(ymd, place):
+        race_no = checkpoint.day(ymd, place)["next"]
+        while race_no <= RACES_PER_DAY and not stop.is_set():
+            if (ymd, place, race_no) in writer.written:
+                checkpoint.advance(ymd, place, race_no)
+                race_no += 1
+                continue
+            try:
+                # 1Rは開催の有無を確かめるだけなので、推測の探索を予算内で打ち切る
+                budgets = BACKFILL_FIRST_RACE_BUDGETS if race_no == 1 else None
+                rows, filename, race_title, used_url = pipe.submit(ymd, place, race_no, budgets).result()
+            except CardNotFound as e:
+                if unreachable():
+                    return
+                if race_no == 1:
+                    checkpoint.advance(ymd, place, RACES_PER_DAY, state="skipped")
+                    bump("skipped_days")
+                    return
+                checkpoint.advance(ymd, place, race_no, error=str(e))
+                bump("missing")
+            except Exception as e:
+                if unreachable():
+                    return
+                checkpoint.advance(ymd, place, race_no, error=str(e))
+                bump("failed")
+            else:
+                if filename != f"{ymd}_{place}_{race_no}R.xlsx":
+                    # 見出しの開催日・場所・Rが違う: 別のレースのページなので書かない
+                    get_url_cache().evict(ymd, place, race_no)
+                    checkpoint.advance(ymd, place, race_no, error=f"別のレースのページでした: {filename}")
+                    bump("missing")
+                else:
+                    writer.add(RaceKey(ymd, place, race_no), rows, race_title, used_url)
+                    checkpoint.advance(ymd, place, race_no)
+                    bump("ok")
+                    bump("rows", len(rows))
+            race_no += 1
+            if status_cb:
+                elapsed = time.perf_counter() - started
+                done = stats["ok"] + stats["missing"] + stats["failed"]
+                status_cb(f"取り込み中... {ymd} {place}{race_no - 1}R / {done}レース {done / elapsed:.2f}件/秒")
+
+    # 開催日×場所ごとのワーカーは1レースずつ進み、取得・解析は CardPipeline に任せる
+    if todo and not site_reachable():
+        # 通信障害中の探索は全候補が失敗するまで長くかかるので、始める前に確かめる
+        halt_offline()
+    pipe = CardPipeline(workers, races=len(todo) * RACES_PER_DAY, debug_log=debug_log)
+    if debug_log and pipe.processes:
+        debug_log(f"解析プロセス: {pipe.processes}")
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="backfill") as pool:
+            pending = {pool.submit(do_day, *u) for u in todo}
+            try:
+                while pending:
+                    done, pending = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        try:
+                            fut.result()
+                        except Exception as e:
+                            if debug_log:
+                                debug_log(f"✗ 取り込みエラー: {e}")
+            except KeyboardInterrupt:
+                # 各ワーカーが今のレースを書き終えてから止まる
+                stop.set()
+                if debug_log:
+                    debug_log("中断します（次回は続きから再開します）")
+    finally:
+        pipe.close()
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    races = stats["ok"] + stats["missing"] + stats["failed"]
+    remaining = sum(1 for u in units if checkpoint.day(*u)["state"] == "running")
+    return dict(stats, elapsed_sec=round(elapsed, 2), races=races,
+                races_per_sec=round(races / elapsed, 3) if elapsed else 0.0,
+                remaining_days=remaining, complete=remaining == 0,
+                out=out_path, checkpoint=checkpoint.path)
@@ -0,0 +1,84 @@
+"""開催単位の一括作成"""
+import threading
+from concurrent.futures import as_completed
+from datetime import datetime, timedelta
+
+from .config import VENUES, BATCH_WORKERS
+from .discovery import get_race_index
+from .pipeline import CardPipeline
+from .sinks import RaceKey, open_sinks
+
+def date_range(start: str, end: str | None = None) -> list:
+    """YYYYMMDD の開始日〜終了日（含む）を列挙"""
+    d = datetime.strptime(start, "%Y%m%d")
+    last = datetime.strptime(end or start, "%Y%m%d")
+    days = []
+    while d <= last:
+        days.append(d.strftime("%Y%m%d"))
+        d += timedelta(days=1)
+    return days
+
+def run_batch(dates, places=VENUES, races=range(1, 13), per_race_files: bool = False,
+              status_cb=None, debug_log=None, workers: int = BATCH_WORKERS,
+              out_dir: str | None = None, formats=("xlsx",)):
+    """
+    開催日×場所×R の出馬表をまとめて作成する。
+    一覧ページは開催日ごとに1回だけ取得して全レースで共有し（RaceIndex）、
+    各レースの探索・取得はワーカースレッドで、解析は CardPipeline の解析プロセスで並列に行い、
+    終わった順に書き出す。
+    開催日の一覧ページ（/keiba/thisweek/{開催日}/）にレースが載っている場合、載っていない場所・Rは未開催として飛ばす。
+    formats は出力形式（"xlsx" / "csv" / "jsonl" / "sqlite"）。"xlsx" を外せば Excel は作らない。
+    """
+    result = {"paths": [], "ok": [], "skipped": [], "failed": []}
+    index = get_race_index()
+
+    jobs = []
+    for ymd in dates:
+        index.ensure_fresh(ymd, debug_log)
+        indexed = index.has_date(ymd)
+        for place in places:
+            for rno in races:
+                if indexed and not index.lookup(ymd, place, rno):
+                    result["skipped"].append((ymd, place, rno))
+                    continue
+                jobs.append((ymd, place, rno))
+    if debug_log:
+        debug_log(f"一括作成: {len(jobs)}レースを処理（未開催 {len(result['skipped'])}件は省略）")
+
+    seen_urls = {}
+    seen_lock = threading.Lock()
+
+    def check_url(job, url):
+        with seen_lock:
+            if seen_urls.setdefault(url, job) != job:
+                raise RuntimeError(f"他のレースと同じページでした: {url}")
+
+    basename = f"{dates[0]}_全レース" if len(dates) == 1 else f"{dates[0]}-{dates[-1]}_全レース"
+    sinks = []
+    # 取得はスレッド、解析はレース数が多ければ別プロセスで行う
+    with CardPipeline(workers, races=len(jobs), debug_log=debug_log, on_url=check_url) as pipe:
+        if debug_log and pipe.processes:
+            debug_log(f"解析プロセス: {pipe.processes}")
+        futures = {pipe.submit(*job): job for job in jobs}
+        for n, fut in enumerate(as_completed(futures), 1):
+            ymd, place, rno = job = futures[fut]
+            try:
+                rows, filename, race_title, url = fut.result()
+            except Exception as e:
+                result["failed"].append((job, str(e)))
+                if debug_log:
+                    debug_log(f"✗ {ymd} {place}{rno}R: {e}")
+                continue
+            result["ok"].append(job)
+            if not sinks:
+                # 1件も取れなかったときに空のファイルを作らないよう、最初の1件で開く
+                sinks = open_sinks(formats, basename, out_dir, per_race_files)
+            key = RaceKey(*job)
+            for sink in sinks:
+                sink.add(key, rows, race_title, url, filename=filename)
+            if status_cb:
+                status_cb(f"一括作成中... {n}/{len(jobs)}")
+
+    for sink in sinks:
+        result["paths"].extend(sink.close())
+    return result
@@ -0,0 +1,225 @@
+"""コマンドライン版（GUIなしで cron などから実行する）
+
+    python -m jra_excel_maker fetch --date 20251108 --venue 東京 --race 11
+    python -m jra_excel_maker fetch --url "https://www.jra.go.jp/JRADB/accessD.html?CNAME=..."
+    python -m jra_excel_maker batch --date 20251108 --to 20251109 --venue 東京 --venue 京都
+    python -m jra_excel_maker batch --date 20251108 --format csv --format sqlite
+    python -m jra_excel_maker refresh ~/Desktop/20251108_全レース.xlsx
+    python -m jra_excel_maker watch --date 20251108 --venue 東京 --races 9-12 --until 1545
+    python -m jra_excel_maker backfill --date 20250105 --to 20251228 --out 2025.jsonl
+
+結果は標準出力に JSON で1件出す。探索ログは -v で標準エラーへ。
+探索・Excel 用のモジュールはサブコマンドの実行時に初めて読み込む。
+"""
+import argparse, json, re, sys, time
+from datetime import datetime, timedelta
+
+from .config import VENUES, VENUE_CODE
+
+def parse_venue(value: str) -> str:
+    """場所名（東京）または場所コード（05）を場所名にそろえる"""
+    if value in VENUE_CODE:
+        return value
+    for name, code in VENUE_CODE.items():
+        if value.zfill(2) == code:
+            return name
+    raise argparse.ArgumentTypeError(f"不明な場所です: {value}（{'・'.join(VENUES)} または 01〜10）")
+
+def parse_date(value: str) -> str:
+    if not re.fullmatch(r"\d{8}", value):
+        raise argparse.ArgumentTypeError("日付は YYYYMMDD で指定してください")
+    return value
+
+def parse_races(value: str) -> list:
+    """'11' / '1-12' / '9,10,11' を R の一覧にする"""
+    races = set()
+    for part in value.split(","):
+        m = re.fullmatch(r"(\d{1,2})(?:-(\d{1,2}))?R?", part.strip())
+        if not m:
+            raise argparse.ArgumentTypeError(f"レース指定が不正です: {value}")
+        lo, hi = int(m.group(1)), int(m.group(2) or m.group(1))
+        races.update(range(lo, hi + 1))
+    if not races or min(races) < 1 or max(races) > 12:
+        raise argparse.ArgumentTypeError("レースは 1〜12 で指定してください")
+    return sorted(races)
+
+def cmd_fetch(args, debug_log):
+    from .discovery import fetch_race_card
+    from .parse import fetch_rows_and_meta
+
+    if args.url:
+        card = fetch_rows_and_meta(args.url)
+    else:
+        if args.venue is None or args.race is None:
+            raise ValueError("--url を使わない場合は --venue と --race が必要です")
+        card = fetch_race_card(args.date, args.venue, args.race, debug_log=debug_log)
+        if not card:
+            return {"ok": False, "error": "該当するレースのURLが見つかりませんでした"}
+
+    rows, filename, race_title, used_url = card
+    result = {
+        "ok": True, "url": used_url, "race_title": race_title, "filename": filename,
+        "rows": [{"umaban": u, "horse": h, "jockey": j} for u, h, j in rows],
+    }
+    if not args.no_excel:
+        from .excel import save_to_desktop
+        result["path"] = save_to_desktop(rows, filename, race_title, args.out, used_url)
+    return result
+
+def cmd_batch(args, debug_log):
+    from .batch import date_range, run_batch
+
+    dates = date_range(args.date, args.to)
+    res = run_batch(dates, args.venue or VENUES, args.races, per_race_files=args.per_race,
+                    debug_log=debug_log, workers=args.workers, out_dir=args.out,
+                    formats=args.format or ["xlsx"])
+    race = lambda job: {"date": job[0], "venue": job[1], "race": job[2]}
+    return {
+        "ok": bool(res["ok"]),
+        "paths": res["paths"],
+        "races": [race(job) for job in res["ok"]],
+        "skipped": [race(job) for job in res["skipped"]],
+        "failed": [dict(race(job), error=msg) for job, msg in res["failed"]],
+    }
+
+def cmd_refresh(args, debug_log):
+    from .refresh import refresh_workbook
+
+    res = refresh_workbook(args.path, debug_log=debug_log, workers=args.workers)
+    return {
+        "ok": not res["failed"],
+        "path": res["path"],
+        "checked": res["checked"],
+        "changed": res["changed"],
+        "changes": res["changes"],
+        "failed": [{"sheet": sheet, "error": msg} for sheet, msg in res["failed"]],
+    }
+
+def parse_until(value: str) -> float:
+    """HHMM を time.time() の値にする。もう過ぎた時刻なら翌日のその時刻"""
+    if not re.fullmatch(r"\d{4}", value) or int(value[:2]) > 23 or int(value[2:]) > 59:
+        raise argparse.ArgumentTypeError("時刻は HHMM（0000〜2359）で指定してください")
+    now = datetime.now()
+    t = now.replace(hour=int(value[:2]), minute=int(value[2:]), second=0, microsecond=0)
+    if t <= now:
+        t += timedelta(days=1)
+    return t.timestamp()
+
+def cmd_watch(args, debug_log):
+    from .watch import Watcher
+
+    def on_event(target, kind, detail):
+        print(f"{time.strftime('%H:%M:%S')} 【{kind}】{target.label}: {detail}", file=sys.stderr, flush=True)
+
+    targets = [(ymd, place, rno) for ymd in [args.date] for place in (args.venue or VENUES) for rno in args.races]
+    watcher = Watcher(targets, out_dir=args.out, debug_log=debug_log, on_event=on_event,
+                      min_interval=args.min_interval, max_interval=args.max_interval)
+    try:
+        watcher.run(until=args.until)
+    except KeyboardInterrupt:
+        pass
+    return {
+        "ok": True,
+        "published": [{"race": t.label, "path": t.path, "url": t.url, "checks": t.checks, "changes": t.changes}
+                      for t in watcher.targets if t.path],
+        "waiting": [t.label for t in watcher.targets if not t.path],
+        "events": [{"time": tm, "race": race, "kind": kind, "detail": detail}
+                   for tm, race, kind, detail in watcher.events],
+    }
+
+def cmd_backfill(args, debug_log):
+    from .batch import date_range
+    from .backfill import backfill_dates, run_backfill
+
+    def status(msg):
+        print(msg, file=sys.stderr, flush=True)
+
+    dates = backfill_dates(date_range(args.date, args.to), weekdays=args.weekdays)
+    res = run_backfill(dates, args.out, args.venue or VENUES, checkpoint_path=args.checkpoint,
+                       workers=args.workers, status_cb=status if args.verbose else None, debug_log=debug_log,
+                       retry_skipped=args.retry_skipped)
+    return dict(res, ok=res["complete"])
+
+def build_parser() -> argparse.ArgumentParser:
+    from .config import BATCH_WORKERS, WATCH_MIN_INTERVAL, WATCH_MAX_INTERVAL
+    from .sinks import FORMATS
+
+    parser = argparse.ArgumentParser(prog="jra_excel_maker", description="JRA出馬表を取得して Excel に保存します。")
+    parser.add_argument("-v", "--verbose", action="store_true", help="探索ログを標準エラーに出す")
+    parser.add_argument("--trace", action="store_true", help="計測ログ（jra_runs.jsonl）に span 1件ごとの行も書く（既定: 実行ごとの集計だけ）")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    today = datetime.now().strftime("%Y%m%d")
+    p = sub.add_parser("fetch", help="1レース分を取得")
+    p.add_argument("--date", type=parse_date, default=today, help="開催日 YYYYMMDD（既定: 今日）")
+    p.add_argument("--venue", type=parse_venue, help="場所（東京 / 05 など）")
+    p.add_argument("--race", type=int, choices=range(1, 13), metavar="1-12", help="レース番号")
+    p.add_argument("--url", help="出馬表URLを直接指定（探索しない）")
+    p.add_argument("--out", help="保存先フォルダ（既定: デスクトップ）")
+    p.add_argument("--no-excel", action="store_true", help="Excelを作らず JSON だけ出す")
+    p.set_defaults(func=cmd_fetch)
+
+    p = sub.add_parser("batch", help="開催日×場所×R をまとめて取得")
+    p.add_argument("--date", type=parse_date, default=today, help="開始日 YYYYMMDD（既定: 今日）")
+    p.add_argument("--to", type=parse_date, help="終了日 YYYYMMDD（省略時は開始日のみ）")
+    p.add_argument("--venue", type=parse_venue, action="append", help="場所（複数指定可、既定: 全場）")
+    p.add_argument("--races", type=parse_races, default=list(range(1, 13)), help="レース（例: 11 / 1-12 / 9,10,11）")
+    p.add_argument("--per-race", action="store_true", help="1レース1ファイルで保存（既定: 1ブックにシートごと）")
+    p.add_argument("--format", choices=FORMATS, action="append",
+                   help="出力形式（複数指定可、既定: xlsx）。csv / jsonl / sqlite だけなら Excel は作らない")
+    p.add_argument("--workers", type=int, default=BATCH_WORKERS, help="同時に処理するレース数")
+    p.add_argument("--out", help="保存先フォルダ（既定: デスクトップ）")
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser("refresh", help="作成済みExcelに取消・騎手変更などの差分を反映（評価・短評は残す）")
+    p.add_argument("path", help="このツールで作成した .xlsx")
+    p.add_argument("--workers", type=int, default=BATCH_WORKERS, help="同時に確認するレース数")
+    p.set_defaults(func=cmd_refresh)
+
+    p = sub.add_parser("watch", help="出馬表の公開・変更を監視し、Excelを作成・更新し続ける（Ctrl+C で終了）")
+    p.add_argument("--date", type=parse_date, default=today, help="開催日 YYYYMMDD（既定: 今日）")
+    p.add_argument("--venue", type=parse_venue, action="append", help="場所（複数指定可、既定: 全場）")
+    p.add_argument("--races", type=parse_races, default=list(range(1, 13)), help="レース（例: 11 / 1-12 / 9,10,11）")
+    p.add_argument("--until", type=parse_until, help="この時刻 HHMM で終了（過ぎていれば翌日のその時刻、既定: Ctrl+C まで）")
+    p.add_argument("--min-interval", type=float, default=WATCH_MIN_INTERVAL, help="確認間隔の最短（秒）")
+    p.add_argument("--max-interval", type=float, default=WATCH_MAX_INTERVAL, help="確認間隔の最長（秒）")
+    p.add_argument("--out", help="保存先フォルダ（既定: デスクトップ）")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser("backfill", help="過去の開催を JSON Lines にまとめて取り込む（中断しても続きから再開）")
+    p.add_argument("--date", type=parse_date, required=True, help="開始日 YYYYMMDD")
+    p.add_argument("--to", type=parse_date, required=True, help="終了日 YYYYMMDD")
+    p.add_argument("--venue", type=parse_venue, action="append", help="場所（複数指定可、既定: 全場）")
+    p.add_argument("--out", required=True, help="出力先 .jsonl（既存なら追記）")
+    p.add_argument("--checkpoint", help="チェックポイントのパス（既定: 出力先 + .checkpoint.json）")
+    p.add_argument("--workers", type=int, default=BATCH_WORKERS, help="同時に処理する開催日×場所の数")
+    p.add_argument("--weekdays", action="store_true", help="平日も対象にする（既定: 土日のみ）")
+    p.add_argument("--retry-skipped", action="store_true", help="前回までに未開催とみなした開催日×場所も探し直す")
+    p.set_defaults(func=cmd_backfill)
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    debug_log = (lambda msg: print(msg, file=sys.stderr, flush=True)) if args.verbose else None
+
+    from .config import RUN_LOG_SPANS
+    from .report import start_run, finish_run
+
+    started = time.perf_counter()
+    start_run(args.command, spans=args.trace or RUN_LOG_SPANS)
+    try:
+        result = args.func(args, debug_log)
+    except Exception as e:
+        result = {"ok": False, "error": str(e)}
+    result["elapsed_sec"] = round(time.perf_counter() - started, 3)
+    report = finish_run()
+    result["report"] = report.summary()
+    if debug_log:
+        debug_log(report.summary_text())
+    if "jra_excel_maker.ratelimit" in sys.modules:
+        from .ratelimit import get_rate_limiter
+        result["rate_limit"] = get_rate_limiter().stats()
+
+    json.dump(result, sys.stdout, ensure_ascii=False)
+    sys.stdout.write("\n")
+    return 0 if result.get("ok") else 1
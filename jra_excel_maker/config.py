@@ -0,0 +1,93 @@
+"""設定値と共通定数"""
+import os, sys
+
+VENUES = ["札幌","函館","福島","新潟","東京","中山","中京","京都","阪神","小倉"]
+VENUE_CODE = {
+    "札幌":"01","函館":"02","福島":"03","新潟":"04",
+    "東京":"05","中山":"06","中京":"07","京都":"08",
+    "阪神":"09","小倉":"10",
+}
+
+# JRAサイトの起点（ベンチマーク用のスタブサーバーへ向けるときは環境変数で上書き）
+JRA_BASE_URL = os.environ.get("JRA_BASE_URL", "https://www.jra.go.jp").rstrip("/")
+
+PROBE_WORKERS = 8     # 候補URLを同時に試行する数の上限
+
+# 戦略の並列実行（build_jra_url_and_soup）
+# 優先度: 全体のプローブ数 STRATEGY_WORKERS をこの比率で分け合う
+# 予算: 1回の探索でその戦略が投げてよい最大プローブ数（None=候補すべて）
+STRATEGY_WORKERS    = 12
+STRATEGY_PRIORITIES = {"パターン分析": 2, "日付バリエーション": 1, "ページスクレイピング": 3}
+STRATEGY_BUDGETS    = {"パターン分析": 51, "日付バリエーション": None, "ページスクレイピング": None}
+# 過去データ取り込みで開催の有無を確かめる1Rの探索予算（過去の開催は一覧に載らず、大半は未開催）
+BACKFILL_FIRST_RACE_BUDGETS = {"パターン分析": 12, "日付バリエーション": 24, "ページスクレイピング": None}
+
+# HTTP接続プール（全取得経路で共有）
+HTTP_POOL_HOSTS = 4     # ホストごとにプールを保持する数
+HTTP_POOL_SIZE  = 16    # 1ホストあたりの keep-alive 接続数
+HTTP_RETRIES    = 2     # 接続失敗・5xx/429 の再試行回数
+HTTP_BACKOFF    = 0.5   # 再試行の待ち時間係数（0.5, 1.0, 2.0 … 秒）
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# ホストごとの流量制御（全リクエスト共通の送信枠）
+RATE_LIMIT_RPS           = 8.0   # 開始時の1秒あたりリクエスト数
+RATE_LIMIT_MIN_RPS       = 1.0
+RATE_LIMIT_MAX_RPS       = 20.0
+RATE_LIMIT_BURST         = 8     # まとめて送れる数（トークンバケットの容量）
+RATE_LIMIT_CONCURRENCY   = 8     # 1ホストへの同時接続数の上限
+RATE_LIMIT_LATENCY_SPIKE = 3.0   # 平均応答時間のこの倍を超えたら減速
+RATE_LIMIT_LATENCY_FLOOR = 1.0   # ただしこの秒数未満の応答は急増とみなさない
+RATE_LIMIT_COOLDOWN      = 2.0   # 減速したときに送信を止める秒数
+RATE_LIMIT_TRIP_ERRORS   = 5     # 接続エラーがこの回数続いたら、そのホストはつながらないとみなす
+RATE_LIMIT_TRIP_SECONDS  = 30.0  # その間の送信は待たずに失敗させ、過ぎたら1回だけ試し直す
+
+# HTTPレスポンスのキャッシュ（ETag / Last-Modified で再検証）
+HTTP_CACHE_DIR       = "jra_http_cache"
+HTTP_CACHE_MAX_BYTES = 50 * 1024 * 1024   # 圧縮後の合計サイズ上限
+HTTP_CACHE_INDEX_SAVE_INTERVAL = 5.0       # 索引（index.json）を書き直す最短間隔（秒）。残りは終了時に書く
+
+# 発見済みURLのキャッシュ（exeと同じフォルダに保存）
+URL_CACHE_FILE     = "jra_url_cache.json"
+URL_CACHE_TTL      = 14 * 24 * 3600   # 見つかったURLの有効期間（秒）
+URL_CACHE_MISS_TTL = 10 * 60          # 「見つからなかった」結果の有効期間（秒）
+
+# 開催一覧から作るレースインデックス
+RACE_INDEX_FILE    = "jra_race_index.json"
+RACE_INDEX_MAX_AGE = 30 * 60          # 一覧ページを取り直すまでの時間（秒）
+RACE_INDEX_KEEP    = 7 * 24 * 3600    # これより古い一覧は読み込み時に捨てる（秒）
+
+# CNAME推測の学習（ヒット実績から候補順を決める）
+PROBE_STATS_FILE  = "jra_probe_stats.json"
+PROBE_STATS_PRIOR = 0.5               # 実績のない値にも残す重み（平滑化）
+
+# 処理段階ごとの計測ログ（JSON Lines）
+RUN_LOG_FILE      = "jra_runs.jsonl"
+RUN_LOG_MAX_BYTES = 5 * 1024 * 1024   # 超えたら .1 に回して新しく書き始める
+RUN_LOG_SPANS     = os.environ.get("JRA_RUN_LOG_SPANS") == "1"   # span 1件ごとの行も書く（既定は実行ごとの集計だけ）
+
+# GUIのデバッグログ（画面には直近の行だけ、全行はファイルへ）
+GUI_LOG_FILE       = "jra_gui.log"
+GUI_LOG_MAX_BYTES  = 5 * 1024 * 1024   # 超えたら .1 に回して新しく書き始める
+GUI_LOG_VIEW_LINES = 2000              # 画面に残す行数
+GUI_LOG_FLUSH_MS   = 100               # 画面へまとめて反映する間隔（ミリ秒）
+
+BATCH_WORKERS = 4     # 一括作成で同時に処理するレース数
+SQLITE_BULK_ROWS = 1000   # SQLite へまとめて入れる頭数（1トランザクション分）
+
+# 一括作成・過去データ取り込みでは、HTML の解析を別プロセスに回す（取得はスレッドのまま）
+PARSE_PROCESSES         = 0    # 解析プロセス数（0 = CPUコア数、1 = プロセスを使わずスレッド内で解析）
+PARSE_PROCESS_MIN_RACES = 24   # これより少ないレース数ならプロセスを起動しない（起動の方が高くつく）
+
+# 監視モード（出馬表の公開・変更を待つ）
+# 変化がなければ確認間隔を WATCH_BACKOFF 倍ずつ延ばし、変化があれば最短に戻す
+WATCH_MIN_INTERVAL = 60          # 秒
+WATCH_MAX_INTERVAL = 15 * 60     # 秒
+WATCH_BACKOFF      = 1.5
+
+def app_dir() -> str:
+    """キャッシュ類の保存先。環境変数 JRA_DATA_DIR > exe（PyInstaller）のフォルダ > リポジトリ直下"""
+    if os.environ.get("JRA_DATA_DIR"):
+        return os.environ["JRA_DATA_DIR"]
+    if getattr(sys, "frozen", False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
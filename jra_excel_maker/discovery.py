@@ -0,0 +1,761 @@
+"""出馬表URLの探索（キャッシュ・開催一覧インデックス・推測戦略）"""
+import os, re, json, threading, time
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+from datetime import datetime, timedelta
+
+import requests
+from bs4 import BeautifulSoup
+
+from .config import (
+    VENUE_CODE, PROBE_WORKERS, STRATEGY_WORKERS, STRATEGY_PRIORITIES, STRATEGY_BUDGETS,
+    URL_CACHE_FILE, URL_CACHE_TTL, URL_CACHE_MISS_TTL,
+    RACE_INDEX_FILE, RACE_INDEX_MAX_AGE, RACE_INDEX_KEEP, JRA_BASE_URL, app_dir,
+)
+from .httpcache import get_http_cache
+from .net import http_get, decode_response
+from .parse import extract_meta, fetch_rows_and_meta, find_table_and_headers, looks_like_race_card
+from .ranking import get_probe_stats, url_features
+from .ratelimit import HostUnreachable, get_rate_limiter
+from .report import span, count, strategy_scope
+
+_singleton_lock = threading.Lock()
+
+def try_fetch(url: str, debug_log=None):
+    """URLからHTMLを取得し、出馬表として有効か判定"""
+    try:
+        r = http_get(url, timeout=8)
+        if debug_log:
+            debug_log(f"試行: {url[:90]}... → {r.status_code}")
+    except HostUnreachable:
+        raise   # つながらないので、呼び出し元で探索ごと打ち切る
+    except Exception as e:
+        if debug_log:
+            debug_log(f"接続失敗: {str(e)[:50]}")
+        return None
+    
+    if r.status_code != 200:
+        return None
+    
+    # 大半のプローブは外れなので、解析前にバイト列で判定して捨てる
+    if not looks_like_race_card(r.content, r.headers.get("Content-Type", "")):
+        return None
+    
+    html = decode_response(r, debug_log)
+    with span("parse", url=url):
+        soup = BeautifulSoup(html, "lxml")
+    
+    # 出馬表ページの特徴をチェック
+    table, _, _ = find_table_and_headers(soup)
+    if not table:
+        return None
+    
+    # レース名要素の存在確認
+    race_name = soup.select_one(".race_name") or soup.find(string=re.compile(r"\d+回.*(札幌|函館|福島|新潟|東京|中山|中京|京都|阪神|小倉)"))
+    if not race_name:
+        return None
+    
+    if debug_log:
+        debug_log(f"  ✓ 有効な出馬表ページを検出！")
+    return soup
+
+def is_race_page(soup: BeautifulSoup, yyyymmdd: str, place: str, race_no: int) -> bool:
+    """出馬表の見出し（開催日・場所・R）が指定のレースと一致するか"""
+    return extract_meta(soup) == (yyyymmdd, place, f"{int(race_no)}R")
+
+class StrategyRun:
+    """
+    並列に走らせる1戦略の状態。停止フラグは全戦略で共有し、
+    どれかが出馬表を見つけたら残りはそこで打ち切る。
+    """
+
+    def __init__(self, name: str, stop: threading.Event, workers: int = PROBE_WORKERS,
+                 budget: int | None = None, on_progress=None):
+        self.name = name
+        self.stop = stop
+        self.workers = workers
+        self.budget = budget
+        self.on_progress = on_progress
+        self.probes = 0
+        self.total = None
+        self.state = "待機"
+        self._lock = threading.Lock()
+
+    def update(self, state: str | None = None, total: int | None = None, probe: bool = False):
+        with self._lock:
+            if state is not None:
+                self.state = state
+            if total is not None:
+                self.total = total
+            if probe:
+                self.probes += 1
+        if self.on_progress:
+            self.on_progress()
+
+    def progress_text(self) -> str:
+        with self._lock:
+            if self.total is None:
+                return self.state
+            return f"{self.state} {self.probes}/{self.total}"
+
+def probe_candidates(urls, debug_log=None, max_workers: int = PROBE_WORKERS,
+                     limit: int | None = None, validate=None, label: str = "プローブ",
+                     run: StrategyRun | None = None):
+    """
+    候補URLを有界ワーカープールで並列に試行し、最初に見つかった出馬表を返す。
+    ヒットした時点で未着手のプローブはすべてキャンセルする。
+    validate(soup) を渡すと、try_fetch を通ったページをさらに絞り込む。
+    run を渡すと、そのワーカー数・予算に従い、他の戦略の成功でも停止する。
+    ホストが遮断された（HostUnreachable）ら残りの候補は試さず、その例外を投げる。
+    """
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats = {"probes": 0}
+    if run:
+        max_workers = run.workers
+        if run.budget is not None:
+            limit = run.budget if limit is None else min(limit, run.budget)
+        if isinstance(urls, list):
+            run.update(state="探索中", total=len(urls) if limit is None else min(limit, len(urls)))
+
+    def stopped():
+        return stop.is_set() or (run is not None and run.stop.is_set())
+
+    def log(msg):
+        # ヒット後に返ってくる残りのプローブはログに出さない
+        if debug_log and not stopped():
+            debug_log(msg)
+
+    def probe(url):
+        if stopped():
+            return None
+        with lock:
+            stats["probes"] += 1
+        if run:
+            run.update(probe=True)
+        with strategy_scope(label):
+            count("probes")
+            soup = try_fetch(url, log)
+            if soup is None or (validate and not validate(soup)):
+                count("misses")
+                return None
+            count("hits")
+        return soup
+
+    started = time.perf_counter()
+    hit = None
+    unreachable = None
+    it = iter(urls)
+    pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="probe")
+    try:
+        pending = {}
+        submitted = 0
+        while True:
+            # 同時実行数の上限まで候補を投入
+            while len(pending) < max_workers and (limit is None or submitted < limit):
+                url = next(it, None)
+                if url is None:
+                    break
+                pending[pool.submit(probe, url)] = url
+                submitted += 1
+            if not pending or (run and run.stop.is_set()):
+                break
+            done, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            for fut in done:
+                url = pending.pop(fut)
+                try:
+                    soup = fut.result()
+                except HostUnreachable as e:
+                    unreachable = e
+                    continue
+                except Exception as e:
+                    log(f"プローブ失敗: {e}")
+                    continue
+                if soup is not None and hit is None:
+                    hit = (url, soup)
+            if hit or unreachable:
+                break
+    finally:
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if debug_log:
+        elapsed = time.perf_counter() - started
+        rate = stats["probes"] / elapsed if elapsed > 0 else 0.0
+        first_hit = f"{elapsed:.2f}秒" if hit else "なし"
+        debug_log(f"{label}: {stats['probes']}件 / {elapsed:.2f}秒 ({rate:.1f}件/秒) / 初回ヒットまで: {first_hit}")
+    if unreachable and not hit:
+        raise unreachable
+    return hit if hit else (None, None)
+
+def probe_ranked(place: str, candidates: list, debug_log=None, limit: int | None = None,
+                 label: str = "プローブ", run: StrategyRun | None = None, validate=None):
+    """
+    (url, 特徴) の候補を過去のヒット実績順に並べ替えてから probe_candidates に渡す。
+    重複URL（10R以上では "11" と "11" が同じになる）は先に除く。
+    """
+    seen = set()
+    unique = [(u, f) for u, f in candidates if not (u in seen or seen.add(u))]
+    stats = get_probe_stats()
+    ranked, expected = stats.rank(place, unique)
+    if limit is not None:
+        ranked = ranked[:limit]
+    urls = [u for u, _ in ranked]
+    if debug_log:
+        mean_rank = stats.mean_hit_rank()
+        debug_log(f"{label}: 候補{len(urls)}件 / 期待プローブ数 {expected:.1f}件"
+                  f"（学習データ {stats.hits()}件" + (f"・過去の平均ヒット順位 {mean_rank:.1f}件目" if mean_rank else "") + "）")
+    url, soup = probe_candidates(urls, debug_log, validate=validate, label=label, run=run)
+    if url:
+        rank = urls.index(url) + 1
+        stats.record_rank(rank)
+        if debug_log:
+            debug_log(f"{label}: {rank}件目の候補でヒット")
+    return url, soup
+
+def strategy_1_pattern_analysis(yyyymmdd: str, place: str, race_no: int, debug_log=None, run: StrategyRun | None = None):
+    """
+    戦略1: 提供されたURLパターンの分析
+    pw01dde01 05 20250501 11 20251108 /EB
+            場所 開催日   R# 今日の日付
+    
+    サフィックスの規則性を探る
+    """
+    code = VENUE_CODE.get(place)
+    if not code:
+        return None, None
+    
+    if debug_log:
+        debug_log("【戦略1】パターン分析による推測")
+    
+    # 今日の日付とその前後
+    today = datetime.now()
+    access_dates = [
+        today.strftime("%Y%m%d"),
+        (today + timedelta(days=1)).strftime("%Y%m%d"),
+        (today - timedelta(days=1)).strftime("%Y%m%d"),
+    ]
+    
+    # 観測されたサフィックスとその周辺
+    # EB=235, 39=57, 1B=27 (16進数→10進数)
+    # これらから規則性を推測
+    suffixes = ["EB", "39", "1B", "E9", "EA", "EC", "37", "38", "3A", "19", "1A", "1C", "1D"]
+    
+    race_variants = [f"{race_no:02d}", f"{race_no}"]
+    endpoints = ["accessD.html", "accessS.html"]
+    
+    candidates = []
+    for endpoint in endpoints:
+        for rn in race_variants:
+            for offset, access_date in zip((0, 1, -1), access_dates):
+                for suffix in suffixes:
+                    cname = f"pw01dde{code}{yyyymmdd}{rn}{access_date}/{suffix}"
+                    candidates.append((f"{JRA_BASE_URL}/JRADB/{endpoint}?CNAME={cname}", {
+                        "endpoint": endpoint, "rn": "02d" if len(rn) == 2 else "d",
+                        "access_offset": str(offset), "suffix": suffix,
+                    }))
+    
+    # 最大51件まで（実績のある組み合わせから先に）
+    return probe_ranked(place, candidates, debug_log, limit=51, label="戦略1", run=run,
+                        validate=lambda soup: is_race_page(soup, yyyymmdd, place, race_no))
+
+def strategy_2_date_variations(yyyymmdd: str, place: str, race_no: int, debug_log=None, run: StrategyRun | None = None):
+    """
+    戦略2: 日付バリエーション探索
+    開催日と回数の組み合わせパターン
+    """
+    code = VENUE_CODE.get(place)
+    if not code:
+        return None, None
+    
+    if debug_log:
+        debug_log("【戦略2】日付バリエーション探索")
+    
+    # 開催日の前後も試す（週末開催などの可能性）
+    dt = datetime.strptime(yyyymmdd, "%Y%m%d")
+    race_dates = [
+        dt.strftime("%Y%m%d"),
+        (dt - timedelta(days=1)).strftime("%Y%m%d"),
+        (dt + timedelta(days=1)).strftime("%Y%m%d"),
+    ]
+    
+    today = datetime.now().strftime("%Y%m%d")
+    race_variants = [f"{race_no:02d}", f"{race_no}"]
+    
+    # より広範囲のサフィックス
+    candidates = []
+    for i in range(256):
+        suffix = f"{i:02X}"
+        for offset, race_date in zip((0, -1, 1), race_dates):
+            for rn in race_variants:
+                cname = f"pw01dde{code}{race_date}{rn}{today}/{suffix}"
+                candidates.append((f"{JRA_BASE_URL}/JRADB/accessD.html?CNAME={cname}", {
+                    "endpoint": "accessD.html", "rn": "02d" if len(rn) == 2 else "d",
+                    "race_offset": str(offset), "suffix": suffix,
+                }))
+                
+                # 20件試して見つからなければ次の日付へ
+                if i > 20:
+                    break
+    
+    # 前後の日付のCNAMEも試すので、見出しの開催日が指定日と一致するページだけ採用する
+    return probe_ranked(place, candidates, debug_log, label="戦略2", run=run,
+                        validate=lambda soup: is_race_page(soup, yyyymmdd, place, race_no))
+
+# ================== 開催一覧インデックス ==================
+# pw01dde01 05 2025 05 01 11 20251108 /EB
+#           場所 年  回 日 R# 開催日   サフィックス
+CNAME_RE = re.compile(r"pw01dde01(\d{2})(\d{4})(\d{2})(\d{2})(\d{2})(\d{8})/([0-9A-Fa-f]{2})")
+ONCLICK_CNAME_RE = re.compile(r"CNAME=([^'\"&\s]+)")
+DOACTION_RE = re.compile(r"doAction\(\s*['\"](/JRADB/access[A-Z]\.html)['\"]\s*,\s*['\"]([^'\"]+)['\"]")
+CODE_VENUE = {v: k for k, v in VENUE_CODE.items()}
+
+def decode_cname(cname: str):
+    """CNAMEから (開催日, 場所, R) を取り出す。形式が違えば None"""
+    m = CNAME_RE.search(cname)
+    if not m:
+        return None
+    place = CODE_VENUE.get(m.group(1))
+    if not place:
+        return None
+    return m.group(6), place, int(m.group(5))
+
+def extract_jradb_links(soup: BeautifulSoup) -> set:
+    """一覧ページの href / onclick から JRADB のURLをすべて集める"""
+    links = set()
+    for elem in soup.find_all(["a", "button", "div", "span"]):
+        # href属性
+        href = elem.get("href", "")
+        if "JRADB" in href and "CNAME" in href:
+            links.add(href if href.startswith("http") else f"{JRA_BASE_URL}{href}")
+        
+        # onClick属性からCNAME抽出
+        onclick = elem.get("onclick", "")
+        match = ONCLICK_CNAME_RE.search(onclick)
+        if match:
+            links.add(f"{JRA_BASE_URL}/JRADB/accessD.html?CNAME={match.group(1)}")
+        match = DOACTION_RE.search(onclick) or DOACTION_RE.search(href)
+        if match:
+            links.add(f"{JRA_BASE_URL}{match.group(1)}?CNAME={match.group(2)}")
+    return links
+
+class RaceIndex:
+    """
+    今週の開催一覧ページを1回ずつ取得し、見つかったJRADBリンクを
+    (開催日, 場所, R) で引けるようにしておく。
+    各一覧ページは RACE_INDEX_MAX_AGE を過ぎたときだけ取り直す。
+    """
+
+    def __init__(self, path: str, max_age: float = None):
+        self.path = path
+        self.max_age = RACE_INDEX_MAX_AGE if max_age is None else max_age
+        self._lock = threading.Lock()
+        self._pages = {}     # 一覧ページURL → {"ts": 取得時刻, "links": [...]}
+        self._entries = {}   # "開催日_場所_R" → URL
+        self._load()
+
+    @staticmethod
+    def _key(yyyymmdd: str, place: str, race_no: int) -> str:
+        return f"{yyyymmdd}_{place}_{int(race_no)}"
+
+    @staticmethod
+    def day_page(yyyymmdd: str) -> str:
+        """その開催日の全場・全Rが載る一覧ページ"""
+        return f"{JRA_BASE_URL}/keiba/thisweek/{yyyymmdd}/"
+
+    @classmethod
+    def listing_pages(cls, yyyymmdd: str) -> list:
+        return [
+            f"{JRA_BASE_URL}/keiba/thisweek/",
+            cls.day_page(yyyymmdd),
+            f"{JRA_BASE_URL}/",
+        ]
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                pages = json.load(f).get("pages", {})
+        except (OSError, ValueError, AttributeError):
+            return
+        # 1週間以上前に取得した一覧は捨てる
+        now = time.time()
+        self._pages = {u: p for u, p in pages.items() if now - p.get("ts", 0) < RACE_INDEX_KEEP}
+        self._rebuild()
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"pages": self._pages}, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def _rebuild(self):
+        self._entries = {}
+        for page in self._pages.values():
+            for url in page.get("links", []):
+                decoded = decode_cname(url)
+                if decoded:
+                    self._entries[self._key(*decoded)] = url
+
+    def ensure_fresh(self, yyyymmdd: str, debug_log=None, max_age: float | None = None) -> bool:
+        """古くなった一覧ページだけ取り直す。取り直したら True（max_age で鮮度の基準を上書き）"""
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            now = time.time()
+            stale = [u for u in self.listing_pages(yyyymmdd)
+                     if now - self._pages.get(u, {}).get("ts", 0) > max_age]
+            if not stale:
+                if debug_log:
+                    debug_log(f"開催一覧インデックスを使用（{len(self._entries)}レース）")
+                return False
+            for page_url in stale:
+                try:
+                    if debug_log:
+                        debug_log(f"ページ取得: {page_url}")
+                    r = http_get(page_url, timeout=10)
+                    if r.status_code != 200:
+                        # 無いページも取得時刻だけ記録して、毎回取りに行かない
+                        self._pages[page_url] = {"ts": now, "links": []}
+                        continue
+                    if r.from_cache and page_url in self._pages:
+                        # 304: 一覧は前回と同じなのでリンクの抽出を省く
+                        self._pages[page_url]["ts"] = now
+                        if debug_log:
+                            debug_log("  変更なし（304）")
+                        continue
+                    html = decode_response(r, debug_log)
+                    with span("parse", url=page_url):
+                        links = extract_jradb_links(BeautifulSoup(html, "lxml"))
+                    self._pages[page_url] = {"ts": now, "links": sorted(links)}
+                    if debug_log:
+                        debug_log(f"  {len(links)}個のJRADBリンクを発見")
+                except Exception as e:
+                    if debug_log:
+                        debug_log(f"ページ取得エラー: {e}")
+            self._rebuild()
+            self._save()
+            return True
+
+    def lookup(self, yyyymmdd: str, place: str, race_no: int) -> str | None:
+        with self._lock:
+            return self._entries.get(self._key(yyyymmdd, place, race_no))
+
+    def has_date(self, yyyymmdd: str) -> bool:
+        """
+        その開催日の一覧ページ（day_page）にレースが載っているか。
+        トップページ・今週の一覧は注目レースなど一部しか載せないので数えない
+        （載っていない場所・Rを未開催と決めつけないため）。
+        """
+        with self._lock:
+            links = self._pages.get(self.day_page(yyyymmdd), {}).get("links", [])
+        return any((decode_cname(u) or (None,))[0] == yyyymmdd for u in links)
+
+    def links(self) -> list:
+        with self._lock:
+            return sorted({u for p in self._pages.values() for u in p.get("links", [])})
+
+_race_index = None
+
+def get_race_index() -> RaceIndex:
+    global _race_index
+    with _singleton_lock:
+        if _race_index is None:
+            _race_index = RaceIndex(os.path.join(app_dir(), RACE_INDEX_FILE))
+        return _race_index
+
+def strategy_3_scrape_pages(yyyymmdd: str, place: str, race_no: int, debug_log=None, run: StrategyRun | None = None):
+    """
+    戦略3: JRAの開催一覧ページから全リンクを抽出（インデックス化して再利用）
+    """
+    if debug_log:
+        debug_log("【戦略3】JRAページからリンク抽出")
+    
+    index = get_race_index()
+    if run:
+        run.update(state="一覧取得中")
+    index.ensure_fresh(yyyymmdd, debug_log)
+    if run and run.stop.is_set():
+        return None, None
+    
+    def is_target_race(soup):
+        # 本当に該当レースか、見出しの開催日・場所・Rで確認（本文には他のRへのリンクもある）
+        return is_race_page(soup, yyyymmdd, place, race_no)
+    
+    url = index.lookup(yyyymmdd, place, race_no)
+    if url:
+        if debug_log:
+            debug_log(f"インデックスから該当リンクを取得: {url[:80]}...")
+        # CNAMEから場所・Rを確認済みなので、出馬表として有効なら採用
+        soup = try_fetch(url, debug_log)
+        if soup:
+            return url, soup
+    
+    # 抽出したリンクを試行
+    code = VENUE_CODE.get(place)
+    # 場所コードとレース番号を含むURLを優先
+    # CNAMEから別のレースと分かるリンクは除く
+    target = (yyyymmdd, place, int(race_no))
+    candidates = [u for u in index.links()
+                  if u != url and (code in u or str(race_no) in u or f"{race_no:02d}" in u)
+                  and decode_cname(u) in (None, target)]
+    if debug_log:
+        debug_log(f"候補リンク {len(candidates)}件を検証")
+    
+    return probe_candidates(candidates, debug_log, validate=is_target_race, label="戦略3", run=run)
+
+# ================== 発見済みURLキャッシュ ==================
+class UrlCache:
+    """
+    (開催日, 場所, R) → 有効だったURL を JSON に保存する。
+    見つからなかった結果も短い TTL で覚えておき、期限切れや取得に失敗した
+    エントリは自動で削除する。
+    """
+
+    def __init__(self, path: str, ttl: float = URL_CACHE_TTL, miss_ttl: float = URL_CACHE_MISS_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    @staticmethod
+    def _key(yyyymmdd: str, place: str, race_no: int) -> str:
+        return f"{yyyymmdd}_{place}_{int(race_no)}"
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        now = time.time()
+        return {k: v for k, v in data.items() if isinstance(v, dict) and not self._expired(v, now)}
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass  # 書き込めない場所でもツール自体は動かす
+
+    def _expired(self, entry: dict, now: float) -> bool:
+        ttl = self.ttl if entry.get("url") else self.miss_ttl
+        return now - entry.get("ts", 0) > ttl
+
+    def lookup(self, yyyymmdd: str, place: str, race_no: int):
+        """("hit", url) / ("miss", None) / (None, None) を返す"""
+        key = self._key(yyyymmdd, place, race_no)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None
+            if self._expired(entry, time.time()):
+                del self._entries[key]
+                self._save()
+                return None, None
+        return ("hit", entry["url"]) if entry.get("url") else ("miss", None)
+
+    def put(self, yyyymmdd: str, place: str, race_no: int, url: str):
+        with self._lock:
+            self._entries[self._key(yyyymmdd, place, race_no)] = {"url": url, "ts": time.time()}
+            self._save()
+
+    def put_miss(self, yyyymmdd: str, place: str, race_no: int):
+        with self._lock:
+            self._entries[self._key(yyyymmdd, place, race_no)] = {"url": None, "ts": time.time()}
+            self._save()
+
+    def evict(self, yyyymmdd: str, place: str, race_no: int):
+        with self._lock:
+            if self._entries.pop(self._key(yyyymmdd, place, race_no), None) is not None:
+                self._save()
+
+_url_cache = None
+
+def get_url_cache() -> UrlCache:
+    global _url_cache
+    with _singleton_lock:
+        if _url_cache is None:
+            _url_cache = UrlCache(os.path.join(app_dir(), URL_CACHE_FILE))
+        return _url_cache
+
+def build_jra_url_and_soup(yyyymmdd: str, place: str, race_no: int, status_cb=None, debug_log=None,
+                           budgets: dict | None = None):
+    """キャッシュ・開催一覧を確認し、なければ複数の戦略を並列に試行（budgets は run_strategies へ）"""
+    
+    cache = get_url_cache()
+    state, cached_url = cache.lookup(yyyymmdd, place, race_no)
+    if state == "hit":
+        if get_http_cache().has_parsed(cached_url):
+            # 解析済みの出馬表がある: soup を作らず、fetch_rows_and_meta の条件付きGETに任せる
+            if debug_log:
+                debug_log(f"キャッシュ済みURL（解析結果あり）: {cached_url}")
+            return cached_url, None
+        if debug_log:
+            debug_log(f"キャッシュ済みURLを確認: {cached_url}")
+        with strategy_scope("URLキャッシュ"):
+            soup = try_fetch(cached_url, debug_log)
+        if soup:
+            return cached_url, soup
+        if debug_log:
+            debug_log("キャッシュ済みURLが無効になっていたため削除して再探索します")
+        cache.evict(yyyymmdd, place, race_no)
+    elif state == "miss":
+        if debug_log:
+            debug_log(f"直近{URL_CACHE_MISS_TTL // 60}分以内に見つからなかったレースのため探索を省略します")
+        return None, None
+    
+    # 開催一覧インデックスに載っていれば1回の取得で済む
+    indexed_url = get_race_index().lookup(yyyymmdd, place, race_no)
+    if indexed_url and indexed_url != cached_url:
+        if debug_log:
+            debug_log(f"開催一覧インデックスのURLを確認: {indexed_url}")
+        with strategy_scope("開催一覧"):
+            soup = try_fetch(indexed_url, debug_log)
+        if soup:
+            cache.put(yyyymmdd, place, race_no, indexed_url)
+            get_probe_stats().record_hit(place, url_features(indexed_url, yyyymmdd, race_no))
+            return indexed_url, soup
+    
+    url, soup = run_strategies(yyyymmdd, place, race_no, status_cb, debug_log, budgets)
+    if url and soup:
+        cache.put(yyyymmdd, place, race_no, url)
+        get_probe_stats().record_hit(place, url_features(url, yyyymmdd, race_no))
+        return url, soup
+    
+    # 「見つからなかった」を覚えるのはサイトが応答していたときだけ（通信障害でレースを塞がない）
+    if site_reachable():
+        cache.put_miss(yyyymmdd, place, race_no)
+    elif debug_log:
+        debug_log("JRAのサイトにつながらないため、見つからなかった結果は記録しません")
+    return None, None
+
+def site_reachable(timeout: float = 8) -> bool:
+    """JRAのサイトに今つながるか（見つからない＝未開催 と 通信障害 を見分けるため）"""
+    try:
+        return http_get(f"{JRA_BASE_URL}/", timeout=timeout, use_cache=False).status_code < 500
+    except Exception:
+        return False
+
+def fetch_race_card(yyyymmdd: str, place: str, race_no: int, status_cb=None, debug_log=None):
+    """
+    探索して取得・解析まで行い (rows, filename, race_title, url) を返す。見つからなければ None。
+    キャッシュ済みのURL（解析結果あり）は確かめずに使うので、それが 404 や出馬表でない
+    ページになっていたら、URLキャッシュと保存済みの本文・解析結果を消して探索し直す。
+    """
+    url, soup = build_jra_url_and_soup(yyyymmdd, place, race_no, status_cb, debug_log)
+    if not url:
+        return None
+    try:
+        return fetch_rows_and_meta(url, soup, debug_log)
+    except (requests.HTTPError, RuntimeError) as e:
+        if soup is not None:
+            raise
+        if debug_log:
+            debug_log(f"キャッシュ済みURLが無効になっていたため削除して再探索します（{str(e)[:80]}）")
+        get_url_cache().evict(yyyymmdd, place, race_no)
+        get_http_cache().forget(url)
+    url, soup = build_jra_url_and_soup(yyyymmdd, place, race_no, status_cb, debug_log)
+    if not url:
+        return None
+    return fetch_rows_and_meta(url, soup, debug_log)
+
+def run_strategies(yyyymmdd: str, place: str, race_no: int, status_cb=None, debug_log=None,
+                   budgets: dict | None = None):
+    """
+    3つの戦略を同時に走らせ、最初に指定のレース（開催日・場所・R）の出馬表を返した戦略の結果を使う。
+    別のレースのページを返した戦略は採用せず、残りの戦略を待つ。
+    各戦略のワーカー数・予算は STRATEGY_PRIORITIES / STRATEGY_BUDGETS で決め（予算は budgets で上書きできる）、
+    1つが成功した時点で共有の停止フラグを立てて残りを打ち切る。
+    サイトにつながらない（HostUnreachable）ときも全戦略を止め、見つからなかった扱いにせず例外を投げる。
+    """
+    strategies = [
+        ("パターン分析", "戦略1", strategy_1_pattern_analysis),
+        ("日付バリエーション", "戦略2", strategy_2_date_variations),
+        ("ページスクレイピング", "戦略3", strategy_3_scrape_pages),
+    ]
+    # 優先度の高い順に起動
+    strategies.sort(key=lambda t: -STRATEGY_PRIORITIES.get(t[0], 1))
+    total_prio = sum(STRATEGY_PRIORITIES.get(name, 1) for name, _, _ in strategies)
+    budgets = {**STRATEGY_BUDGETS, **(budgets or {})}
+    
+    stop = threading.Event()
+    unreachable = []
+    last_report = [0.0]
+    report_lock = threading.Lock()
+    runs = []
+    
+    def report(force=False):
+        # 状態表示は0.2秒に1回まで
+        if not status_cb:
+            return
+        with report_lock:
+            now = time.perf_counter()
+            if not force and now - last_report[0] < 0.2:
+                return
+            last_report[0] = now
+        status_cb(" / ".join(f"{r.name}: {r.progress_text()}" for r in sorted(runs, key=lambda r: r.name)))
+    
+    for name, short, _ in strategies:
+        workers = max(1, round(STRATEGY_WORKERS * STRATEGY_PRIORITIES.get(name, 1) / total_prio))
+        runs.append(StrategyRun(short, stop, workers=workers, budget=budgets.get(name), on_progress=report))
+    
+    if debug_log:
+        debug_log(f"\n{'='*60}")
+        debug_log("戦略を並列実行: " + " / ".join(f"{short}({name}) ワーカー{r.workers}・予算{r.budget or '無制限'}"
+                                                 for (name, short, _), r in zip(strategies, runs)))
+        debug_log(f"{'='*60}")
+    
+    def prefixed(short):
+        return (lambda msg: debug_log(f"[{short}] {msg}")) if debug_log else None
+    
+    def work(strategy, short, run):
+        try:
+            with strategy_scope(short):
+                url, soup = strategy(yyyymmdd, place, race_no, prefixed(short), run=run)
+        except HostUnreachable as e:
+            unreachable.append(e)
+            stop.set()
+            if debug_log:
+                debug_log(f"[{short}] 接続できないため探索を中止: {e}")
+            url, soup = None, None
+        except Exception as e:
+            if debug_log:
+                debug_log(f"[{short}] 戦略失敗: {e}")
+            url, soup = None, None
+        run.update(state="成功" if url else ("中止" if stop.is_set() else "該当なし"))
+        return url, soup
+    
+    started = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=len(strategies), thread_name_prefix="strategy")
+    futures = {pool.submit(work, strategy, short, run): (name, run)
+               for (name, short, strategy), run in zip(strategies, runs)}
+    try:
+        for fut in as_completed(futures):
+            url, soup = fut.result()
+            if url and soup and not is_race_page(soup, yyyymmdd, place, race_no):
+                if debug_log:
+                    debug_log(f"[{futures[fut][1].name}] 別のレースのページだったため不採用: {url}")
+                continue
+            if url and soup:
+                stop.set()
+                name, run = futures[fut]
+                if debug_log:
+                    debug_log(f"\n✓ 成功！ {run.name}（{name}）が {time.perf_counter() - started:.2f}秒で発見: {url}")
+                    debug_log(f"送信枠: {get_rate_limiter().summary()}")
+                report(force=True)
+                return url, soup
+    finally:
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+    
+    report(force=True)
+    if unreachable:
+        raise unreachable[0]
+    if debug_log:
+        debug_log(f"全戦略で見つかりませんでした（{time.perf_counter() - started:.2f}秒）")
+        debug_log(f"送信枠: {get_rate_limiter().summary()}")
+    return None, None
@@ -0,0 +1,132 @@
+"""Excel（出馬表シート）の書き出し"""
+import hashlib, json, time
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import NamedStyle, PatternFill, Font, Border, Side, Alignment
+from openpyxl.styles.fonts import DEFAULT_FONT
+
+from .report import timed
+from .sinks import desktop_path
+
+HEADERS = ["馬番","馬名","騎手名","評価","短評"]
+COLUMN_WIDTHS = {"A": 6, "B": 28, "C": 20, "D": 10, "E": 50}
+
+# 名前付きスタイル（ブックに1回だけ登録し、セルには名前で付ける）
+STYLE_TITLE  = "出馬表タイトル"
+STYLE_HEADER = "出馬表見出し"
+STYLE_BODY   = "出馬表本文"
+STYLE_CHANGED   = "出馬表変更"   # 更新で書き換えたセル
+STYLE_SCRATCHED = "出馬表取消"   # 更新で出馬表から消えた馬
+
+# 更新（refresh）用に、各シートの取得元URLと内容のハッシュを隠しシートに残す
+META_SHEET   = "_meta"
+META_HEADERS = ["シート","URL","ハッシュ","更新日時"]
+
+def _card_styles() -> list:
+    center = Alignment(horizontal="center", vertical="center")
+    thin = Side(style="thin", color="000000")
+    border = Border(top=thin, bottom=thin, left=thin, right=thin)
+    return [
+        NamedStyle(name=STYLE_TITLE, font=Font(bold=True, size=18), alignment=center,
+                   fill=PatternFill(start_color="FADADD", end_color="FADADD", fill_type="solid")),
+        NamedStyle(name=STYLE_HEADER, font=Font(bold=True), alignment=center, border=border,
+                   fill=PatternFill(start_color="CCFFFF", end_color="CCFFFF", fill_type="solid")),
+        NamedStyle(name=STYLE_BODY, font=DEFAULT_FONT, alignment=center, border=border),
+        NamedStyle(name=STYLE_CHANGED, font=DEFAULT_FONT, alignment=center, border=border,
+                   fill=PatternFill(start_color="FFFF99", end_color="FFFF99", fill_type="solid")),
+        NamedStyle(name=STYLE_SCRATCHED, font=Font(strike=True, color="808080"), alignment=center, border=border),
+    ]
+
+def register_styles(wb):
+    """出馬表用の名前付きスタイルをブックに登録（登録済みなら何もしない）"""
+    for style in _card_styles():
+        if style.name not in wb.style_names:
+            wb.add_named_style(style)
+
+def rows_hash(rows) -> str:
+    """(馬番, 馬名, 騎手) の並びのハッシュ。更新時にこれが同じなら差分を取らない"""
+    data = json.dumps([list(r) for r in rows], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+def meta_row(sheet_name: str, url: str, rows) -> list:
+    return [sheet_name, url, rows_hash(rows), time.strftime("%Y-%m-%d %H:%M:%S")]
+
+def _styled(ws, value, style):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
+
+def write_card_sheet(ws, rows, race_title):
+    """
+    出馬表1レース分をシートに書き込む。行は上から append するだけなので
+    書き込み専用（write_only）のシートでも通常のシートでも使える。
+    スタイルは register_styles() で登録済みであること。
+    """
+    for col, width in COLUMN_WIDTHS.items():
+        ws.column_dimensions[col].width = width
+    ws.row_dimensions[1].height = 30
+
+    ws.append([_styled(ws, race_title, STYLE_TITLE)])
+    if hasattr(ws, "merge_cells"):
+        ws.merge_cells("A1:E1")
+    else:   # 書き込み専用シートは範囲を登録するだけ
+        ws.merged_cells.add("A1:E1")
+    ws.append([_styled(ws, h, STYLE_HEADER) for h in HEADERS])
+    for umaban, horse, jockey in rows:
+        ws.append([_styled(ws, v, STYLE_BODY) for v in (umaban, horse, jockey, "", "")])
+
+class CardWorkbook:
+    """
+    出馬表のブックを書き込み専用モードで組み立てる。
+    シートは add_card() のたびに1枚ずつ一時ファイルへ流し込まれ、
+    セルのオブジェクトをメモリに溜めない。
+
+        with CardWorkbook(path) as book:
+            book.add_card("東京11R", rows, race_title)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.wb = Workbook(write_only=True)
+        register_styles(self.wb)
+        self.sheets = 0
+        self._meta = []
+
+    def add_card(self, sheet_name: str, rows, race_title: str, url: str | None = None):
+        sheet_name = sheet_name[:31]
+        write_card_sheet(self.wb.create_sheet(sheet_name), rows, race_title)
+        self.sheets += 1
+        if url:
+            self._meta.append(meta_row(sheet_name, url, rows))
+
+    def save(self) -> str:
+        if self._meta:
+            ws = self.wb.create_sheet(META_SHEET)
+            ws.sheet_state = "hidden"
+            ws.append(META_HEADERS)
+            for row in self._meta:
+                ws.append(row)
+        self.wb.save(self.path)
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.save()
+
+@timed("save_to_desktop")
+def save_to_desktop(rows, filename, race_title, out_dir: str | None = None, url: str | None = None):
+    with CardWorkbook(desktop_path(filename, out_dir)) as book:
+        book.add_card("出馬表", rows, race_title, url)
+    return book.path
+
+@timed("save_batch_to_desktop")
+def save_batch_to_desktop(cards, filename, out_dir: str | None = None):
+    """cards: [(シート名, rows, race_title[, url]), ...] を1つのブックに保存（ジェネレーターでもよい）"""
+    with CardWorkbook(desktop_path(filename, out_dir)) as book:
+        for card in cards:
+            book.add_card(*card)
+    return book.path
@@ -0,0 +1,199 @@
+"""ETag / Last-Modified で再検証するディスク上のHTTPレスポンスキャッシュ"""
+import atexit, hashlib, json, os, threading, time, zlib
+
+from .config import HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_INDEX_SAVE_INTERVAL, app_dir
+
+class HttpCache:
+    """
+    200 応答の本文を圧縮して保存し、次回は If-None-Match / If-Modified-Since を付けて
+    問い合わせる。304 なら本文を取り直さずに保存済みのものを使う。
+    本文ごとに解析結果（出馬表の行など）も持てるので、変わっていなければ再解析も省ける。
+    合計サイズが上限を超えたら、最後に使ってから長いものから消す（LRU）。
+    解析結果は本文の隣（<key>.parsed.json）に置き、索引 index.json には検証子などだけを持つ。
+    索引は応答ごとには書かず、save_interval 秒に1回と flush()（終了時）で書く。
+    """
+
+    def __init__(self, directory: str, max_bytes: int = HTTP_CACHE_MAX_BYTES,
+                 save_interval: float = HTTP_CACHE_INDEX_SAVE_INTERVAL):
+        self.dir = directory
+        self.max_bytes = max_bytes
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved = 0.0
+        self._index_path = os.path.join(directory, "index.json")
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.dir, key + ".z")
+
+    def _parsed_path(self, key: str) -> str:
+        return os.path.join(self.dir, key + ".parsed.json")
+
+    def _remove_files(self, key: str):
+        for path in (self._body_path(key), self._parsed_path(key)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _save_index(self, force: bool = False):
+        """ロックを持って呼ぶ。前回から save_interval 秒たっていなければ印だけ付けて後回しにする"""
+        now = time.monotonic()
+        if not force and now - self._saved < self.save_interval:
+            self._dirty = True
+            return
+        tmp = self._index_path + ".tmp"
+        try:
+            os.makedirs(self.dir, exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp, self._index_path)
+        except OSError:
+            pass
+        self._saved = now
+        self._dirty = False
+
+    def flush(self):
+        """後回しにしていた索引の書き込みを済ませる"""
+        with self._lock:
+            if self._dirty:
+                self._save_index(force=True)
+
+    def validators(self, url: str) -> dict:
+        """条件付きGET用のヘッダー（保存済みでなければ空）"""
+        with self._lock:
+            entry = self._entries.get(self._key(url))
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def load(self, url: str):
+        """(本文, Content-Type) を返す。なければ None"""
+        key = self._key(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            try:
+                with open(self._body_path(key), "rb") as f:
+                    body = zlib.decompress(f.read())
+            except (OSError, zlib.error):
+                self._entries.pop(key, None)
+                self._remove_files(key)
+                self._save_index()
+                return None
+            entry["atime"] = time.time()
+        return body, entry.get("content_type", "")
+
+    def store(self, url: str, body: bytes, headers) -> bool:
+        """検証子（ETag / Last-Modified）のある 200 応答だけ保存する"""
+        etag, last_modified = headers.get("ETag"), headers.get("Last-Modified")
+        if not (etag or last_modified):
+            return False
+        key = self._key(url)
+        data = zlib.compress(body, 6)
+        with self._lock:
+            try:
+                os.makedirs(self.dir, exist_ok=True)
+                with open(self._body_path(key), "wb") as f:
+                    f.write(data)
+            except OSError:
+                return False
+            # 本文が変わったので前の解析結果は使えない
+            try:
+                os.remove(self._parsed_path(key))
+            except OSError:
+                pass
+            self._entries[key] = {
+                "url": url, "etag": etag, "last_modified": last_modified,
+                "content_type": headers.get("Content-Type", ""),
+                "size": len(data), "atime": time.time(),
+                "sha1": hashlib.sha1(body).hexdigest(),
+            }
+            self._evict()
+            self._save_index()
+        return True
+
+    def has_parsed(self, url: str) -> bool:
+        """保存済み本文に対応する解析結果があるか（読み込まずに確かめる）"""
+        with self._lock:
+            entry = self._entries.get(self._key(url))
+            return bool(entry and entry.get("parsed"))
+
+    def parsed(self, url: str):
+        """保存済み本文に対応する解析結果（なければ None）"""
+        key = self._key(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry or not entry.get("parsed"):
+                return None
+            if entry["parsed"] is not True:
+                return entry["parsed"]   # 索引に解析結果ごと持っていた頃の形式
+            try:
+                with open(self._parsed_path(key), encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                entry.pop("parsed", None)
+                self._save_index()
+                return None
+
+    def put_parsed(self, url: str, value):
+        """いま保存されている本文の解析結果として value を記録（JSON化できる値）"""
+        key = self._key(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            try:
+                with open(self._parsed_path(key), "w", encoding="utf-8") as f:
+                    json.dump(value, f, ensure_ascii=False)
+            except OSError:
+                return
+            entry["parsed"] = True
+            self._save_index()
+
+    def forget(self, url: str):
+        """保存済みの本文と解析結果を消す（URLが無効になったとき）"""
+        key = self._key(url)
+        with self._lock:
+            if self._entries.pop(key, None) is None:
+                return
+            self._remove_files(key)
+            self._save_index()
+
+    def _evict(self):
+        total = sum(e.get("size", 0) for e in self._entries.values())
+        if total <= self.max_bytes:
+            return
+        # 上限の9割まで、古く使われたものから消す
+        for key, entry in sorted(self._entries.items(), key=lambda kv: kv[1].get("atime", 0)):
+            if total <= self.max_bytes * 0.9:
+                break
+            self._remove_files(key)
+            total -= entry.get("size", 0)
+            del self._entries[key]
+
+_http_cache = None
+_http_cache_lock = threading.Lock()
+
+def get_http_cache() -> HttpCache:
+    global _http_cache
+    with _http_cache_lock:
+        if _http_cache is None:
+            _http_cache = HttpCache(os.path.join(app_dir(), HTTP_CACHE_DIR))
+            atexit.register(_http_cache.flush)
+        return _http_cache
@@ -0,0 +1,45 @@
+"""ログの受け渡し（ワーカースレッド → 画面・ファイル）
+
+    sink = LogSink(path)
+    sink.push("試行: ...")        # どのスレッドからでも（キューに積むだけ）
+    lines = sink.drain()         # GUIスレッドがタイマーでまとめて取り出す。ファイルにもここで書く
+"""
+import os, queue, time
+
+from .config import GUI_LOG_MAX_BYTES
+
+class LogSink:
+    """
+    push はキューに積むだけなのでワーカーを待たせない。
+    drain で溜まった行をまとめて取り出し、全行をファイルに追記する。
+    ファイルが max_bytes を超えたら .1 に回す（1世代だけ残す）。
+    """
+
+    def __init__(self, path: str | None = None, max_bytes: int = GUI_LOG_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._queue = queue.SimpleQueue()
+
+    def push(self, msg: str):
+        self._queue.put((time.strftime("%Y-%m-%d %H:%M:%S"), msg))
+
+    def drain(self, limit: int = 100_000) -> list:
+        """溜まっている行を古い順に返す（最大 limit 行）"""
+        items = []
+        try:
+            while len(items) < limit:
+                items.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        if items and self.path:
+            self._write(items)
+        return [msg for _, msg in items]
+
+    def _write(self, items: list):
+        try:
+            if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                os.replace(self.path, self.path + ".1")
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(f"{ts} {msg}\n" for ts, msg in items))
+        except OSError:
+            pass
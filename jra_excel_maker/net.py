@@ -0,0 +1,119 @@
+"""HTTPセッション（全取得経路で共有）"""
+import codecs, re, threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .config import HTTP_POOL_HOSTS, HTTP_POOL_SIZE, HTTP_RETRIES, HTTP_BACKOFF, USER_AGENT
+from .httpcache import get_http_cache
+from .ratelimit import get_rate_limiter
+from .report import span, count
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session() -> requests.Session:
+    """keep-alive 接続プールと再試行ポリシーを持つ共有セッションを返す"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=HTTP_RETRIES, backoff_factor=HTTP_BACKOFF,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(["GET", "HEAD"]),
+                respect_retry_after_header=True, raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+            s = requests.Session()
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            s.headers.update({"User-Agent": USER_AGENT, "Connection": "keep-alive"})
+            _session = s
+        return _session
+
+def http_get(url: str, timeout: float = 10, use_cache: bool = True, **kwargs) -> requests.Response:
+    """
+    すべての取得処理はここを通す（接続を使い回し、ホストごとの送信枠を守る）。
+    保存済みの応答があれば条件付きGETにし、304 のときは保存済みの本文を
+    200 として返す（r.from_cache が True になる）。
+    """
+    cache = get_http_cache() if use_cache else None
+    headers = dict(kwargs.pop("headers", None) or {})
+    if cache:
+        headers.update(cache.validators(url))
+    with get_rate_limiter().slot(url) as done:
+        # DNS解決・接続・応答ヘッダー受信まで（requests ではこれ以上分けられない）
+        with span("http.connect", url=url) as sp:
+            r = get_session().get(url, timeout=timeout, headers=headers, stream=True, **kwargs)
+            sp["status"] = r.status_code
+        with span("http.download", url=url) as sp:
+            sp["bytes"] = len(r.content)
+        done(r.status_code)
+    count("bytes", len(r.content))
+    r.from_cache = False
+    if not cache:
+        return r
+    if r.status_code == 304:
+        cached = cache.load(url)
+        if cached is None:
+            # 本文が消えていたら普通に取り直す
+            return http_get(url, timeout=timeout, use_cache=False, **kwargs)
+        r.status_code = 200
+        r._content, content_type = cached
+        if content_type:
+            r.headers["Content-Type"] = content_type
+        r.from_cache = True
+    elif r.status_code == 200:
+        cache.store(url, r.content, r.headers)
+    return r
+
+# ================== 文字コード判定 ==================
+_HEADER_CHARSET_RE = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.I)
+_META_CHARSET_RE = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?([\w.:-]+)", re.I)
+_charset_cache = {}   # (ホスト, パス) → 文字コード
+_charset_lock = threading.Lock()
+
+def _normalize_charset(name: str | None) -> str | None:
+    try:
+        codec = codecs.lookup(name).name if name else None
+    except LookupError:
+        return None
+    # JRAの Shift_JIS ページには機種依存文字（①・髙 など）が混ざるので cp932 で読む
+    return "cp932" if codec == "shift_jis" else codec
+
+def resolve_encoding(r: requests.Response) -> tuple:
+    """
+    (文字コード, 判定元) を返す。判定元は header / meta / cache / detect。
+    ヘッダー → <meta charset> → 同じホスト・パスで前回わかった値 の順に見て、
+    どれもなければ apparent_encoding（全文の統計判定）を使う。
+    """
+    parts = urlsplit(r.url or "")
+    key = (parts.netloc, parts.path)
+
+    m = _HEADER_CHARSET_RE.search(r.headers.get("Content-Type", ""))
+    enc, source = (_normalize_charset(m.group(1)), "header") if m else (None, None)
+    if not enc:
+        m = _META_CHARSET_RE.search(r.content[:4096])
+        enc, source = (_normalize_charset(m.group(1).decode("ascii", "ignore")), "meta") if m else (None, None)
+    if not enc:
+        with _charset_lock:
+            enc, source = _charset_cache.get(key), "cache"
+    if not enc:
+        enc, source = _normalize_charset(r.apparent_encoding) or "utf-8", "detect"
+
+    with _charset_lock:
+        _charset_cache[key] = enc
+    return enc, source
+
+def decode_response(r: requests.Response, debug_log=None) -> str:
+    """文字コードを決めて本文を文字列で返す"""
+    with span("decode") as sp:
+        enc, source = resolve_encoding(r)
+        r.encoding = enc
+        text = r.text
+        sp.update(encoding=enc, source=source)
+    if debug_log:
+        debug_log(f"  文字コード: {enc}（{source}）")
+    return text
@@ -0,0 +1,204 @@
+"""出馬表ページの解析"""
+import re
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+from bs4.element import Tag
+
+from .httpcache import get_http_cache
+from .net import http_get, decode_response
+from .report import span, timed
+
+# 解析で使う正規表現（行・セルごとに使うので先にコンパイルしておく）
+_WS_RE       = re.compile(r"\s+")
+_PAREN_RE    = re.compile(r"[（(]")
+_NUM_RE      = re.compile(r"\d{1,2}")
+_LEAD_NUM_RE = re.compile(r"\D*(\d{1,2})\D*")
+_ALL_NUM_RE  = re.compile(r"\d+")
+_DATE_RE     = re.compile(r"(\d{4})年(\d{1,2})月(\d{1,2})日")
+_PLACE_RE    = re.compile(r"\d+\s*回\s*(札幌|函館|福島|新潟|東京|中山|中京|京都|阪神|小倉)\s*\d+\s*日")
+_RACE_RE     = re.compile(r"(\d{1,2})\s*レース")
+_RACE_R_RE   = re.compile(r"(\d{1,2})\s*R")
+
+def anchor_text(cell: Tag) -> str:
+    if hasattr(cell, "find"):
+        a = cell.find("a")
+        if a:
+            t = a.get_text(strip=True)
+            if t:
+                return t
+        return cell.get_text(strip=True)
+    return str(cell).strip()
+
+def clean_name(s: str) -> str:
+    return _PAREN_RE.split(s, maxsplit=1)[0].strip()
+
+def find_col_index(header_map: dict, candidates) -> int | None:
+    for key in candidates:
+        for h, idx in header_map.items():
+            if h == key: return idx
+    for key in candidates:
+        for h, idx in header_map.items():
+            if key in h: return idx
+    return None
+
+def _cells(tr: Tag) -> list:
+    """行の直下の td/th（入れ子の表のセルは拾わない）"""
+    return [c for c in tr.children if getattr(c, "name", None) in ("td", "th")]
+
+def _header_rows(table: Tag) -> tuple:
+    """見出し行（thead があればその行すべて、なければ最初の行）と見出しセル"""
+    thead = table.find("thead")
+    if thead:
+        trs = thead.find_all("tr") or [thead]
+        return trs, [c for tr in trs for c in tr.find_all(["th","td"])]
+    tr = table.find("tr")
+    return ([tr], _cells(tr)) if tr else ([], [])
+
+@timed("find_table_and_headers")
+def find_table_and_headers(soup: BeautifulSoup):
+    # 表を先頭から1つずつ見て、条件に合った時点で止める
+    t = soup.find("table")
+    while t is not None:
+        table, t = t, t.find_next("table")
+        _, head_cells = _header_rows(table)
+        if not head_cells:
+            continue
+        heads_raw = [c.get_text(strip=True) for c in head_cells]
+        heads_norm = [_WS_RE.sub("", h) for h in heads_raw]
+        has_horse = any("馬名" in h for h in heads_norm)
+        has_jock  = any("騎手" in h for h in heads_norm)
+        if has_horse and has_jock:
+            return table, heads_raw, {h:i for i,h in enumerate(heads_norm)}
+    return None, None, None
+
+# 出馬表ページに必ず含まれる見出し（JRAは Shift_JIS。念のため UTF-8 / EUC-JP も）
+_HORSE_MARKERS = tuple({"馬名".encode(enc) for enc in ("shift_jis", "utf-8", "euc_jp")})
+_JOCKEY_MARKERS = tuple({"騎手".encode(enc) for enc in ("shift_jis", "utf-8", "euc_jp")})
+
+def looks_like_race_card(body: bytes, content_type: str = "") -> bool:
+    """
+    デコードやHTML解析の前に、バイト列だけで出馬表でないページをはじく。
+    ここを通ったページだけ BeautifulSoup で解析する。
+    """
+    if content_type and "html" not in content_type.lower():
+        return False
+    if b"<table" not in body and b"<TABLE" not in body:
+        return False
+    return any(m in body for m in _HORSE_MARKERS) and any(m in body for m in _JOCKEY_MARKERS)
+
+def extract_basic_meta(text_all: str):
+    m_date = _DATE_RE.search(text_all)
+    ymd = f"{int(m_date.group(1)):04d}{int(m_date.group(2)):02d}{int(m_date.group(3)):02d}" if m_date else datetime.now().strftime("%Y%m%d")
+    m_place = _PLACE_RE.search(text_all)
+    place = m_place.group(1) if m_place else "不明"
+    m_r = _RACE_RE.search(text_all) or _RACE_R_RE.search(text_all)
+    race_no = f"{int(m_r.group(1))}R" if m_r else "R"
+    return ymd, place, race_no
+
+def extract_meta(soup: BeautifulSoup):
+    """
+    開催日・場所・R をレース見出し（.race_header の日付欄と .race_number の画像 alt）から取る。
+    見出しの形が違って取り切れないときだけ、ページ全体のテキストから探す。
+    """
+    header = soup.find(class_="race_header") or soup
+    date_el = header.find(class_="date")
+    num_el = header.find(class_="race_number") or soup.find(class_="race_number")
+    num_img = num_el.find("img") if num_el else None
+    head = " ".join(filter(None, (
+        date_el.get_text(" ", strip=True) if date_el else "",
+        num_img.get("alt", "") if num_img else "",
+    )))
+    if _DATE_RE.search(head) and _PLACE_RE.search(head) and _RACE_RE.search(head):
+        return extract_basic_meta(head)
+    return extract_basic_meta(soup.get_text(" ", strip=True))
+
+def fetch_card_page(url: str, debug_log=None):
+    """
+    出馬表ページを条件付きGETで取得する。
+    304（前回から変わっていない）で前回の解析結果があれば (解析結果, r)、なければ (None, r)。
+    解析結果は (rows, filename, race_title)。
+    """
+    r = http_get(url, timeout=15)
+    r.raise_for_status()
+    parsed = get_http_cache().parsed(url) if r.from_cache else None
+    if not parsed:
+        return None, r
+    if debug_log:
+        debug_log("  変更なし（304）: 前回の解析結果を使用")
+    rows, filename, race_title = parsed
+    return ([tuple(row) for row in rows], filename, race_title), r
+
+def parse_card(body: bytes, encoding: str):
+    """
+    出馬表ページのバイト列を解析して (rows, filename, race_title) を返す。
+    プロセスプールからも呼ぶので、引数も戻り値も小さい値だけにする（soup は返さない）。
+    """
+    soup = BeautifulSoup(body.decode(encoding, "replace"), "lxml")
+    return _extract_rows_and_meta(soup)
+
+@timed("fetch_rows_and_meta")
+def fetch_rows_and_meta(url: str, soup: BeautifulSoup | None = None, debug_log=None):
+    if soup is None:
+        parsed, r = fetch_card_page(url, debug_log)
+        if parsed:
+            return (*parsed, url)
+        html = decode_response(r, debug_log)
+        with span("parse", url=url):
+            soup = BeautifulSoup(html, "lxml")
+
+    rows, filename, race_title = _extract_rows_and_meta(soup)
+    get_http_cache().put_parsed(url, [rows, filename, race_title])
+    return rows, filename, race_title, url
+
+def _extract_rows_and_meta(soup: BeautifulSoup):
+    table, _, header_map = find_table_and_headers(soup)
+    if not table:
+        raise RuntimeError("出馬表テーブル（『馬名』『騎手』ヘッダー）が見つかりません。")
+
+    col_umaban = find_col_index(header_map, ["馬番","馬番号"])
+    col_horse  = find_col_index(header_map, ["馬名"])
+    col_jock   = find_col_index(header_map, ["騎手","騎手名"])
+    if col_horse is None or col_jock is None:
+        raise RuntimeError("『馬名』『騎手(騎手名)』列を特定できませんでした。")
+    need = max(col_horse, col_jock)
+
+    # 見出し行を飛ばし、各行は直下のセルだけを見る（表は1回だけ走査）
+    head_trs, _ = _header_rows(table)
+    skip = {id(tr) for tr in head_trs}
+    rows = []
+    for tr in table.find_all("tr"):
+        if id(tr) in skip:
+            continue
+        tds = _cells(tr)
+        if len(tds) <= need:
+            continue
+
+        horse  = clean_name(anchor_text(tds[col_horse]))
+        jockey = clean_name(anchor_text(tds[col_jock]))
+        if not horse or _ALL_NUM_RE.fullmatch(horse):
+            continue
+        if not jockey or jockey == "-":
+            continue
+
+        if col_umaban is not None and len(tds) > col_umaban:
+            m = _NUM_RE.search(anchor_text(tds[col_umaban]))
+            umaban = m.group(0) if m else ""
+        else:
+            m = _LEAD_NUM_RE.match(anchor_text(tds[0]))
+            umaban = m.group(1) if m else ""
+
+        rows.append((umaban, horse, jockey))
+
+    if not rows:
+        raise RuntimeError("馬番／馬名／騎手名の抽出結果が空でした。")
+
+    race_el = soup.find(class_="race_name")
+    race_title = race_el.get_text(strip=True).split("|")[0].strip() if race_el else ""
+
+    ymd, place, race_no = extract_meta(soup)
+    if not race_title:
+        race_title = f"{place}{race_no}"
+
+    filename = f"{ymd}_{place}_{race_no}.xlsx"
+    return rows, filename, race_title
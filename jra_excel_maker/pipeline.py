@@ -0,0 +1,233 @@
+"""複数レースの取得・解析パイプライン（取得はスレッド、解析はプロセス）
+
+    with CardPipeline(workers=4, races=len(jobs)) as pipe:
+        futures = {pipe.submit(ymd, place, rno): (ymd, place, rno) for ...}
+        for fut in as_completed(futures):
+            rows, filename, race_title, url = fut.result()
+
+取得（通信待ち）はスレッドで並列に行い、取得したバイト列だけを解析プロセスへ渡す。
+BeautifulSoup の解析は GIL を握ったまま CPU を使うので、スレッドのままだと
+通信スレッドと取り合いになり、コア数を増やしても速くならない。
+解析プロセスから戻るのは (rows, filename, race_title) だけで、soup は戻さない。
+
+URLキャッシュ・開催一覧で URL が分かるレースは、その場で確かめずに取得して
+解析プロセスに回す。ページが無くなっていた（404 / 410）・出馬表でなかったときは
+従来の探索（build_jra_url_and_soup）でやり直す。タイムアウト・接続エラー・5xx は
+URL のせいではないので、URL を覚えたままそのレースだけ失敗にする。
+"""
+import multiprocessing, os, threading, time
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import requests
+
+from .config import BATCH_WORKERS, PARSE_PROCESSES, PARSE_PROCESS_MIN_RACES
+from .discovery import build_jra_url_and_soup, get_race_index, get_url_cache
+from .httpcache import get_http_cache
+from .net import resolve_encoding
+from .parse import fetch_card_page, fetch_rows_and_meta, looks_like_race_card, parse_card
+from .ranking import get_probe_stats, url_features
+from .report import current_run, span
+
+class CardNotFound(RuntimeError):
+    """出馬表のURLが見つからなかった（未開催・未公開）"""
+
+def parse_processes(races: int, processes: int = PARSE_PROCESSES) -> int:
+    """レース数に見合う解析プロセス数（0 ならプロセスを使わない）"""
+    n = min(processes or os.cpu_count() or 1, races)
+    return n if n > 1 and races >= PARSE_PROCESS_MIN_RACES else 0
+
+class CardPipeline:
+    """
+    submit(開催日, 場所, R) ごとに Future を返し、結果は fetch_rows_and_meta と同じ
+    (rows, filename, race_title, url)。見つからなければ CardNotFound になる。
+    on_url(job, url) を渡すと、URLが決まった時点で（取得スレッドから）呼ぶ。例外を投げればそのレースは失敗。
+    submit の budgets は、URLが分からず探索するときの戦略ごとの予算（run_strategies へ）。
+    """
+
+    def __init__(self, workers: int = BATCH_WORKERS, races: int = 0, processes: int = PARSE_PROCESSES,
+                 debug_log=None, on_url=None):
+        self.debug_log = debug_log
+        self.on_url = on_url
+        self.processes = parse_processes(races, processes)
+        self._threads = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="pipeline")
+        # Windows（exe）と同じ spawn で揃える。fork だと通信スレッドのロックを抱えたまま複製されうる
+        self._procs = (ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"))
+                       if self.processes else None)
+        self._procs_broken = False   # 解析プロセスが落ちたら以降はスレッドで解析する
+        self._lock = threading.Lock()
+        self.stats = {"in_process": 0, "in_thread": 0, "cached": 0, "fallback": 0}
+
+    def _bump(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _log(self, msg: str):
+        if self.debug_log:
+            self.debug_log(msg)
+
+    def submit(self, yyyymmdd: str, place: str, race_no: int, budgets: dict | None = None) -> Future:
+        job = (yyyymmdd, place, race_no)
+        out = Future()
+        fut = self._threads.submit(self._fetch, job, budgets)
+        fut.add_done_callback(lambda f: self._fetched(job, f, out))
+        return out
+
+    # ---- 取得スレッド ----
+    def _locate(self, job, budgets=None):
+        """URLキャッシュ・開催一覧で分かれば (url, None, 出どころ)。分からなければ探索して (url, soup, None)"""
+        state, url = get_url_cache().lookup(*job)
+        if state == "hit":
+            return url, None, "URLキャッシュ"
+        if state == "miss":
+            return None, None, None
+        url = get_race_index().lookup(*job)
+        if url:
+            return url, None, "開催一覧"
+        url, soup = build_jra_url_and_soup(*job, debug_log=self.debug_log, budgets=budgets)
+        return url, soup, None
+
+    def _fetch(self, job, budgets=None):
+        """
+        ("done", 結果) か、解析プロセスに回す ("raw", url, 本文, 文字コード, 出どころ) を返す。
+        推測で探したレースは探索の途中で解析済みなので、そのまま抽出して返す。
+        """
+        url, soup, source = self._locate(job, budgets)
+        if not url:
+            raise CardNotFound("URLが見つかりませんでした")
+        if self.on_url:
+            self.on_url(job, url)
+        if soup is not None:
+            self._bump("in_thread")
+            return "done", fetch_rows_and_meta(url, soup)
+        try:
+            parsed, r = fetch_card_page(url, self.debug_log)
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code not in (404, 410):
+                raise
+            # 覚えていたURLが消えた: 保存済みの本文・解析結果も捨てて探索からやり直す
+            get_http_cache().forget(url)
+            return "retry", str(e)[:80]
+        if parsed:
+            self._bump("cached")
+            return "done", (*parsed, url)
+        if not looks_like_race_card(r.content, r.headers.get("Content-Type", "")):
+            return "retry", "出馬表ではないページでした"
+        enc, _ = resolve_encoding(r)
+        if self._procs is None or self._procs_broken:
+            return "done", self._parse_here(job, url, r.content, enc, source)
+        return "raw", url, r.content, enc, source
+
+    def _parse_here(self, job, url: str, body: bytes, enc: str, source: str | None):
+        """取得済みの本文をこのスレッドで解析する"""
+        with span("parse", url=url):
+            result = parse_card(body, enc)
+        self._remember(job, url, source, result)
+        self._bump("in_thread")
+        return (*result, url)
+
+    def _parse_or_retry(self, job, url: str, body: bytes, enc: str, source: str | None):
+        """解析プロセスが使えなくなったとき: スレッドで解析し、出馬表でなければ探索し直す"""
+        try:
+            return self._parse_here(job, url, body, enc, source)
+        except RuntimeError as e:
+            self._log(f"  {job[0]} {job[1]}{job[2]}R: 解析できませんでした（{e}）。探索し直します")
+            return self._slow(job)
+
+    def _slow(self, job):
+        """URLキャッシュ・開催一覧のURLが外れていたとき: 探索からやり直す（解析もこのスレッドで）"""
+        self._bump("fallback")
+        get_url_cache().evict(*job)
+        url, soup = build_jra_url_and_soup(*job, debug_log=self.debug_log)
+        if not url:
+            raise CardNotFound("URLが見つかりませんでした")
+        if self.on_url:
+            self.on_url(job, url)
+        return fetch_rows_and_meta(url, soup)
+
+    def _remember(self, job, url: str, source: str | None, result):
+        """解析できたURLを覚える（次回は304と解析結果だけで済む）"""
+        get_http_cache().put_parsed(url, list(result))
+        if source == "開催一覧":
+            get_url_cache().put(*job, url)
+            get_probe_stats().record_hit(job[1], url_features(url, job[0], job[2]))
+
+    # ---- Future のつなぎ（取得スレッド → 解析プロセス → 呼び出し元） ----
+    def _fetched(self, job, fut: Future, out: Future):
+        try:
+            kind, *rest = fut.result()
+        except BaseException as e:
+            out.set_exception(e)
+            return
+        if kind == "done":
+            out.set_result(rest[0])
+        elif kind == "retry":
+            self._log(f"  {job[0]} {job[1]}{job[2]}R: {rest[0]}。探索し直します")
+            self._retry(job, out)
+        else:
+            url, body, enc, source = rest
+            t0 = time.perf_counter()
+            try:
+                pf = self._procs.submit(parse_card, body, enc)
+            except (BrokenProcessPool, RuntimeError) as e:
+                # 解析プロセスが落ちていた: 例外をコールバックの外へ出すと out が決まらないまま残る
+                self._give_up_processes(e)
+                self._chain(out, self._parse_or_retry, job, url, body, enc, source)
+                return
+            pf.add_done_callback(lambda f: self._parsed(job, url, body, enc, source, t0, f, out))
+
+    def _give_up_processes(self, e: BaseException):
+        if not self._procs_broken:
+            self._procs_broken = True
+            self._log(f"  解析プロセスが使えなくなりました（{e}）。以降はスレッドで解析します")
+
+    def _parsed(self, job, url: str, body: bytes, enc: str, source: str | None, t0: float,
+                fut: Future, out: Future):
+        try:
+            result = fut.result()
+        except BrokenProcessPool as e:
+            # 解析プロセスが落ちた: 本文は手元にあるのでスレッドで解析し直す
+            self._give_up_processes(e)
+            self._chain(out, self._parse_or_retry, job, url, body, enc, source)
+            return
+        except Exception as e:
+            # 出馬表でなかった（RuntimeError）: スレッド側で探索からやり直す
+            self._log(f"  {job[0]} {job[1]}{job[2]}R: 解析できませんでした（{e}）。探索し直します")
+            self._retry(job, out)
+            return
+        report = current_run()
+        if report:
+            # 受け渡し・待ち時間を含めた解析プロセス1件分
+            report.add_span("parse.process", time.perf_counter() - t0, url=url, bytes=len(body))
+        self._remember(job, url, source, result)
+        self._bump("in_process")
+        out.set_result((*result, url))
+
+    def _retry(self, job, out: Future):
+        self._chain(out, self._slow, job)
+
+    def _chain(self, out: Future, fn, *args):
+        """fn(*args) を取得スレッドで実行し、結果・例外を out に渡す"""
+        try:
+            fut = self._threads.submit(fn, *args)
+        except RuntimeError as e:   # 終了処理に入っていた
+            out.set_exception(e)
+            return
+
+        def done(f):
+            try:
+                out.set_result(f.result())
+            except BaseException as e:
+                out.set_exception(e)
+        fut.add_done_callback(done)
+
+    def close(self):
+        self._threads.shutdown(wait=True)
+        if self._procs:
+            self._procs.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,123 @@
+"""CNAME推測の候補順を、過去にヒットした実績から並べ替える"""
+import json, os, re, threading
+from datetime import datetime
+
+from .config import PROBE_STATS_FILE, PROBE_STATS_PRIOR, app_dir
+
+# 各特徴が取りうる値の数（ラプラス平滑化の分母に使う）
+FEATURE_SIZES = {"endpoint": 2, "rn": 2, "race_offset": 3, "access_offset": 3, "suffix": 256}
+
+# 戦略1・2が組み立てる形: pw01dde 05 20251108 11 20251108 /EB
+GUESS_CNAME_RE = re.compile(r"JRADB/(access[A-Z]\.html)\?CNAME=pw01dde(\d{2})(\d{8})(\d{1,2})(\d{8})/([0-9A-Fa-f]{2})$")
+# 実際の一覧ページにある形: pw01dde01 05 2025 05 01 11 20251108 /EB
+REAL_CNAME_RE = re.compile(r"JRADB/(access[A-Z]\.html)\?CNAME=pw01dde01\d{2}\d{8}\d{2}\d{8}/([0-9A-Fa-f]{2})$")
+
+def _days_between(a: str, b: str) -> int:
+    return (datetime.strptime(a, "%Y%m%d") - datetime.strptime(b, "%Y%m%d")).days
+
+def url_features(url: str, yyyymmdd: str, race_no: int, today: str | None = None) -> dict:
+    """ヒットしたURLから、候補生成に使った特徴（サフィックス等）を取り出す"""
+    m = GUESS_CNAME_RE.search(url)
+    if m:
+        today = today or datetime.now().strftime("%Y%m%d")
+        return {
+            "endpoint": m.group(1),
+            "rn": "02d" if len(m.group(4)) == 2 else "d",
+            "race_offset": str(_days_between(m.group(3), yyyymmdd)),
+            "access_offset": str(_days_between(m.group(5), today)),
+            "suffix": m.group(6).upper(),
+        }
+    m = REAL_CNAME_RE.search(url)
+    if m:
+        return {"endpoint": m.group(1), "suffix": m.group(2).upper()}
+    return {}
+
+class ProbeStats:
+    """
+    場所ごと・全体のヒット回数を特徴別に数えて JSON に保存する。
+    候補の確率は特徴ごとの平滑化した出現率の積で見積もり、
+    場所ごとの実績は全体の実績の2倍の重みで数える。
+    """
+
+    def __init__(self, path: str, prior: float = PROBE_STATS_PRIOR):
+        self.path = path
+        self.prior = prior
+        self._lock = threading.Lock()
+        self._data = {"venues": {}, "all": {}, "ranks": []}
+        try:
+            with open(path, encoding="utf-8") as f:
+                self._data.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def record_hit(self, place: str, features: dict):
+        """ヒットしたURLの特徴を記録"""
+        if not features:
+            return
+        with self._lock:
+            for bucket in (self._data["venues"].setdefault(place, {}), self._data["all"]):
+                for feat, value in features.items():
+                    counts = bucket.setdefault(feat, {})
+                    counts[value] = counts.get(value, 0) + 1
+            self._save()
+
+    def record_rank(self, rank: int):
+        """推測戦略のヒットが何件目の候補だったかを記録（直近200件）"""
+        with self._lock:
+            self._data["ranks"] = (self._data["ranks"] + [rank])[-200:]
+            self._save()
+
+    def hits(self) -> int:
+        with self._lock:
+            return sum(self._data["all"].get("suffix", {}).values())
+
+    def mean_hit_rank(self) -> float | None:
+        """過去のヒットが平均何件目の候補だったか"""
+        with self._lock:
+            ranks = self._data["ranks"]
+            return sum(ranks) / len(ranks) if ranks else None
+
+    def _probability(self, place: str, feat: str, value: str) -> float:
+        venue = self._data["venues"].get(place, {}).get(feat, {})
+        total = self._data["all"].get(feat, {})
+        n = 2 * venue.get(value, 0) + total.get(value, 0)
+        n_all = 2 * sum(venue.values()) + sum(total.values())
+        size = FEATURE_SIZES.get(feat, 2)
+        return (n + self.prior) / (n_all + self.prior * size)
+
+    def rank(self, place: str, candidates: list) -> tuple:
+        """
+        candidates: [(url, features), ...] を当たりやすい順に並べ替え、
+        (並べ替えた一覧, この順に試したときの期待プローブ数) を返す。
+        実績がなければ元の順のまま（安定ソート）。
+        """
+        with self._lock:
+            scored = []
+            for url, feats in candidates:
+                p = 1.0
+                for feat, value in feats.items():
+                    p *= self._probability(place, feat, value)
+                scored.append((p, url, feats))
+        scored.sort(key=lambda t: -t[0])
+        total = sum(p for p, _, _ in scored)
+        expected = sum(i * p for i, (p, _, _) in enumerate(scored, 1)) / total if total else 0.0
+        return [(url, feats) for _, url, feats in scored], expected
+
+_probe_stats = None
+_probe_stats_lock = threading.Lock()
+
+def get_probe_stats() -> ProbeStats:
+    global _probe_stats
+    with _probe_stats_lock:
+        if _probe_stats is None:
+            _probe_stats = ProbeStats(os.path.join(app_dir(), PROBE_STATS_FILE))
+        return _probe_stats
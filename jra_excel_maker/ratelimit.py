@@ -0,0 +1,170 @@
+"""ホストごとの流量制御（トークンバケット＋同時接続上限＋適応的な減速＋遮断）"""
+import threading, time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+
+from .config import (
+    RATE_LIMIT_RPS, RATE_LIMIT_MIN_RPS, RATE_LIMIT_MAX_RPS, RATE_LIMIT_BURST,
+    RATE_LIMIT_CONCURRENCY, RATE_LIMIT_LATENCY_SPIKE, RATE_LIMIT_LATENCY_FLOOR, RATE_LIMIT_COOLDOWN,
+    RATE_LIMIT_TRIP_ERRORS, RATE_LIMIT_TRIP_SECONDS,
+)
+
+class HostUnreachable(requests.ConnectionError):
+    """接続エラーが続いたため、そのホストへの送信を止めている"""
+
+class HostScheduler:
+    """
+    1ホスト分の送信枠。トークンが1つ以上あり、同時接続が上限未満のときだけ送れる。
+    429 / 5xx / タイムアウト / 応答時間の急増でレートを半分にして少し休み、
+    正常な応答が続けば少しずつレートを戻す（AIMD）。
+    接続エラー（応答が1つも返らない失敗）が RATE_LIMIT_TRIP_ERRORS 回続いたら、
+    RATE_LIMIT_TRIP_SECONDS の間は待たせずに HostUnreachable で失敗させる（遮断）。
+    """
+
+    def __init__(self, host: str, rate: float = RATE_LIMIT_RPS, burst: int = RATE_LIMIT_BURST,
+                 concurrency: int = RATE_LIMIT_CONCURRENCY):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._waiting = 0
+        self._latency = None          # 応答時間の指数移動平均
+        self._errors = 0              # 続けて起きた接続エラーの数
+        self._tripped_until = 0.0
+        self._cond = threading.Condition()
+        self.requests = 0
+        self.backoffs = 0
+        self.trips = 0
+        self.total_wait = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def acquire(self) -> float:
+        """送れるまで待つ。待った秒数を返す。遮断中なら HostUnreachable"""
+        started = time.monotonic()
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    if now < self._tripped_until:
+                        raise HostUnreachable(f"{self.host} に接続できません（{self._errors}回続けて失敗）")
+                    self._refill(now)
+                    if now >= self._paused_until and self._in_flight < self.concurrency and self._tokens >= 1:
+                        break
+                    if now < self._paused_until:
+                        timeout = self._paused_until - now
+                    elif self._tokens < 1:
+                        timeout = (1 - self._tokens) / self.rate
+                    else:
+                        timeout = None   # 同時接続の空き待ち（release で起こされる）
+                    self._cond.wait(timeout)
+                self._tokens -= 1
+                self._in_flight += 1
+                self.requests += 1
+            finally:
+                self._waiting -= 1
+            waited = time.monotonic() - started
+            self.total_wait += waited
+        return waited
+
+    def release(self, status: int | None = None, latency: float | None = None, error: bool = False):
+        """応答を受けたら呼ぶ。結果に応じてレートを上げ下げする"""
+        with self._cond:
+            self._in_flight -= 1
+            if error:
+                self._errors += 1
+                if self._errors >= RATE_LIMIT_TRIP_ERRORS:
+                    # 遮断明けの1回目で失敗しても、ここでまた遮断する
+                    now = time.monotonic()
+                    if now >= self._tripped_until:
+                        self.trips += 1
+                    self._tripped_until = now + RATE_LIMIT_TRIP_SECONDS
+            else:
+                self._errors = 0
+            spike = (latency is not None and self._latency is not None
+                     and latency > max(self._latency * RATE_LIMIT_LATENCY_SPIKE, RATE_LIMIT_LATENCY_FLOOR))
+            if error or spike or status == 429 or (status is not None and status >= 500):
+                self.rate = max(RATE_LIMIT_MIN_RPS, self.rate / 2)
+                self._paused_until = max(self._paused_until, time.monotonic() + RATE_LIMIT_COOLDOWN)
+                self.backoffs += 1
+            else:
+                self.rate = min(RATE_LIMIT_MAX_RPS, self.rate + 0.1)
+            if latency is not None and not spike:
+                self._latency = latency if self._latency is None else self._latency * 0.8 + latency * 0.2
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "host": self.host,
+                "rate": round(self.rate, 2),
+                "in_flight": self._in_flight,
+                "queue_depth": self._waiting,
+                "requests": self.requests,
+                "backoffs": self.backoffs,
+                "trips": self.trips,
+                "avg_wait_sec": round(self.total_wait / self.requests, 3) if self.requests else 0.0,
+                "latency_sec": round(self._latency, 3) if self._latency is not None else None,
+            }
+
+class RateLimiter:
+    """ホストごとの HostScheduler をまとめる（全取得経路で1つを共有）"""
+
+    def __init__(self):
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def host(self, url: str) -> HostScheduler:
+        netloc = urlsplit(url).netloc
+        with self._lock:
+            if netloc not in self._hosts:
+                self._hosts[netloc] = HostScheduler(netloc)
+            return self._hosts[netloc]
+
+    @contextmanager
+    def slot(self, url: str):
+        """
+        with limiter.slot(url) as done: ... done(status) のように使う。
+        done を呼ばずに例外で抜けた場合はエラー（タイムアウト等）として扱う。
+        """
+        sched = self.host(url)
+        sched.acquire()
+        started = time.monotonic()
+        result = {}
+
+        def done(status: int):
+            result["status"] = status
+
+        try:
+            yield done
+        except Exception:
+            sched.release(error=True)
+            raise
+        sched.release(status=result.get("status"), latency=time.monotonic() - started)
+
+    def stats(self) -> list:
+        with self._lock:
+            hosts = list(self._hosts.values())
+        return [h.stats() for h in hosts]
+
+    def summary(self) -> str:
+        """ログ用の1行要約"""
+        return " / ".join(
+            f"{s['host']}: {s['rate']}件/秒 同時{s['in_flight']} 待ち行列{s['queue_depth']} "
+            f"平均待ち{s['avg_wait_sec']}秒 減速{s['backoffs']}回" + (f" 遮断{s['trips']}回" if s["trips"] else "")
+            for s in self.stats()
+        )
+
+_rate_limiter = RateLimiter()
+
+def get_rate_limiter() -> RateLimiter:
+    return _rate_limiter
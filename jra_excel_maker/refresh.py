@@ -0,0 +1,151 @@
+"""作成済みExcelの更新（出走取消・騎手変更などの差分だけを書き込む）"""
+import os, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from openpyxl import load_workbook
+
+from .config import BATCH_WORKERS
+from .excel import (
+    META_SHEET, META_HEADERS, STYLE_BODY, STYLE_CHANGED, STYLE_SCRATCHED,
+    register_styles, rows_hash,
+)
+from .parse import fetch_rows_and_meta
+
+CHANGELOG_SHEET   = "変更履歴"
+CHANGELOG_HEADERS = ["日時","シート","馬番","内容","変更前","変更後"]
+
+def read_meta(wb) -> list:
+    """_meta シートの各行を {"sheet", "url", "hash", "row"} で返す"""
+    if META_SHEET not in wb.sheetnames:
+        return []
+    entries = []
+    for row in wb[META_SHEET].iter_rows(min_row=2, max_col=len(META_HEADERS)):
+        sheet, url, digest = (c.value for c in row[:3])
+        if sheet in wb.sheetnames and url:
+            entries.append({"sheet": sheet, "url": url, "hash": digest, "row": row[0].row})
+    return entries
+
+def _key(umaban, horse) -> str:
+    return str(umaban) if umaban not in (None, "") else str(horse)
+
+def patch_card_sheet(ws, rows) -> list:
+    """
+    シートの (馬番, 馬名, 騎手) と新しい rows を馬番で突き合わせ、違うセルだけ書き換える。
+    評価・短評（D・E列）には触れない。消えた馬は行を残したまま取消の書式にする。
+    変更の一覧 [(馬番, 内容, 変更前, 変更後), ...] を返す。
+    """
+    old = {}
+    last_row = 2
+    for cells in ws.iter_rows(min_row=3, max_col=3):
+        umaban, horse, jockey = (c.value for c in cells)
+        if horse in (None, ""):
+            continue
+        old[_key(umaban, horse)] = cells
+        last_row = cells[0].row
+
+    changes = []
+    seen = set()
+    for umaban, horse, jockey in rows:
+        key = _key(umaban, horse)
+        seen.add(key)
+        cells = old.get(key)
+        if cells is None:
+            last_row += 1
+            for col, value in enumerate((umaban, horse, jockey, None, None), 1):
+                cell = ws.cell(row=last_row, column=col, value=value)
+                cell.style = STYLE_CHANGED if col <= 3 else STYLE_BODY
+            changes.append((umaban, "追加", "", f"{horse} / {jockey}"))
+            continue
+        if cells[0].style == STYLE_SCRATCHED:
+            for c in cells:
+                c.style = STYLE_BODY
+            changes.append((umaban, "取消解除", "", horse))
+        for cell, value, label in ((cells[1], horse, "馬名変更"), (cells[2], jockey, "騎手変更")):
+            if (cell.value or "") != value:
+                changes.append((umaban, label, cell.value or "", value))
+                cell.value = value
+                cell.style = STYLE_CHANGED
+
+    for key, cells in old.items():
+        if key not in seen and cells[0].style != STYLE_SCRATCHED:
+            for c in cells:
+                c.style = STYLE_SCRATCHED
+            changes.append((cells[0].value or "", "取消", cells[1].value, ""))
+    return changes
+
+def _append_changelog(wb, stamp: str, sheet: str, changes: list):
+    if CHANGELOG_SHEET in wb.sheetnames:
+        ws = wb[CHANGELOG_SHEET]
+    else:
+        ws = wb.create_sheet(CHANGELOG_SHEET)
+        ws.append(CHANGELOG_HEADERS)
+        for col, width in zip("ABCDEF", (20, 12, 6, 10, 28, 28)):
+            ws.column_dimensions[col].width = width
+    for umaban, what, before, after in changes:
+        ws.append([stamp, sheet, umaban, what, before, after])
+
+def refresh_workbook(path: str, status_cb=None, debug_log=None, workers: int = BATCH_WORKERS) -> dict:
+    """
+    _meta シートに記録したURLを取り直し、内容が変わったシートだけ差分を書き込む。
+    ページが変わっていなければ条件付きGET（304）と前回の解析結果で済むので、
+    かかる時間は変更のあったレース数にほぼ比例する。
+    """
+    wb = load_workbook(path)
+    entries = read_meta(wb)
+    if not entries:
+        raise RuntimeError("このExcelには更新用の情報（_meta シート）がありません。作り直してから実行してください。")
+    register_styles(wb)
+
+    result = {"path": path, "checked": 0, "changed": [], "unchanged": [], "failed": [], "changes": []}
+    fetched = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="refresh") as pool:
+        futures = {pool.submit(fetch_rows_and_meta, e["url"], None, debug_log): e for e in entries}
+        for n, fut in enumerate(as_completed(futures), 1):
+            entry = futures[fut]
+            try:
+                fetched[entry["sheet"]] = fut.result()[0]
+            except Exception as e:
+                result["failed"].append((entry["sheet"], str(e)))
+                if debug_log:
+                    debug_log(f"✗ {entry['sheet']}: {e}")
+            if status_cb:
+                status_cb(f"更新を確認中... {n}/{len(entries)}")
+
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+    meta_ws = wb[META_SHEET]
+    dirty = False
+    for entry in entries:
+        rows = fetched.get(entry["sheet"])
+        if rows is None:
+            continue
+        result["checked"] += 1
+        digest = rows_hash(rows)
+        if digest == entry["hash"]:
+            result["unchanged"].append(entry["sheet"])
+            continue
+        dirty = True
+        changes = patch_card_sheet(wb[entry["sheet"]], rows)
+        meta_ws.cell(row=entry["row"], column=3, value=digest)
+        meta_ws.cell(row=entry["row"], column=4, value=stamp)
+        if not changes:
+            # 並び順だけ変わった等。ハッシュだけ更新する
+            result["unchanged"].append(entry["sheet"])
+            continue
+        result["changed"].append(entry["sheet"])
+        _append_changelog(wb, stamp, entry["sheet"], changes)
+        for umaban, what, before, after in changes:
+            result["changes"].append({"sheet": entry["sheet"], "umaban": umaban, "change": what,
+                                      "before": before, "after": after})
+            if debug_log:
+                debug_log(f"  {entry['sheet']} {umaban}番 {what}: {before} → {after}")
+
+    if dirty:
+        # 書き込み途中で壊れないよう、一時ファイルに保存してから置き換える
+        tmp = path + ".tmp"
+        wb.save(tmp)
+        try:
+            os.replace(tmp, path)
+        except PermissionError:
+            os.remove(tmp)
+            raise RuntimeError("Excelでファイルを開いたままになっています。閉じてから実行してください。")
+    return result
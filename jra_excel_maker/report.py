@@ -0,0 +1,159 @@
+"""処理段階ごとの計測（span）と実行ごとの集計レポート
+
+    run = start_run("fetch")
+    with span("parse", url=url):
+        ...
+    report = finish_run()      # 集計して JSON Lines に書く
+    print(report.summary_text())
+
+span は実行中の RunReport があるときだけ集計し、実行の最後に summary 行を
+RUN_LOG_FILE へ JSON 1行で追記する。span 1件ごとの行は start_run(..., spans=True)
+（CLI の --trace・環境変数 JRA_RUN_LOG_SPANS=1）のときだけ書く。
+ファイルが RUN_LOG_MAX_BYTES を超えたら .1 に回す（1世代だけ残す）。
+"""
+import functools, json, os, threading, time, uuid
+from contextlib import contextmanager
+
+from .config import RUN_LOG_FILE, RUN_LOG_MAX_BYTES, RUN_LOG_SPANS, app_dir
+
+_local = threading.local()
+
+class RunReport:
+    """1回の実行（GUIのボタン1回、CLIコマンド1回）の計測結果"""
+
+    def __init__(self, name: str, path: str | None = None, spans: bool = False,
+                 max_bytes: int = RUN_LOG_MAX_BYTES):
+        self.name = name
+        self.run_id = uuid.uuid4().hex[:12]
+        self.path = path
+        self.spans = spans
+        self.max_bytes = max_bytes
+        self.started = time.time()
+        self.elapsed = None
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._spans = {}      # 名前 → [件数, 合計秒, 最大秒]
+        self._strategies = {} # 戦略 → {"probes", "hits", "misses", "bytes"}
+
+    def _write(self, record: dict):
+        if not self.path:
+            return
+        line = json.dumps(dict(record, run=self.run_id), ensure_ascii=False)
+        try:
+            if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                os.replace(self.path, self.path + ".1")
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError:
+            pass
+
+    def add_span(self, name: str, seconds: float, **attrs):
+        with self._lock:
+            agg = self._spans.setdefault(name, [0, 0.0, 0.0])
+            agg[0] += 1
+            agg[1] += seconds
+            agg[2] = max(agg[2], seconds)
+            if self.spans:
+                self._write(dict(attrs, type="span", name=name, ms=round(seconds * 1000, 2), ts=round(time.time(), 3)))
+
+    def count(self, strategy: str, key: str, n: int = 1):
+        with self._lock:
+            c = self._strategies.setdefault(strategy, {"probes": 0, "hits": 0, "misses": 0, "bytes": 0})
+            c[key] += n
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "run": self.run_id,
+                "elapsed_sec": round(self.elapsed if self.elapsed is not None else time.perf_counter() - self._t0, 3),
+                "spans": {
+                    name: {"count": n, "total_ms": round(total * 1000, 1),
+                           "mean_ms": round(total * 1000 / n, 2), "max_ms": round(mx * 1000, 1)}
+                    for name, (n, total, mx) in sorted(self._spans.items(), key=lambda kv: -kv[1][1])
+                },
+                "strategies": {k: dict(v) for k, v in self._strategies.items()},
+            }
+
+    def summary_text(self) -> str:
+        """ログ表示用（時間のかかった段階から順に）"""
+        s = self.summary()
+        lines = [f"計測 {s['name']} 合計 {s['elapsed_sec']:.2f}秒"]
+        for name, v in s["spans"].items():
+            lines.append(f"  {name:<24} {v['count']:>5}回 合計{v['total_ms']:>9.1f}ms 平均{v['mean_ms']:>8.2f}ms 最大{v['max_ms']:>8.1f}ms")
+        for name, v in s["strategies"].items():
+            lines.append(f"  {name}: プローブ{v['probes']} ヒット{v['hits']} 外れ{v['misses']} 受信{v['bytes'] / 1024:.1f}KB")
+        return "\n".join(lines)
+
+    def finish(self):
+        with self._lock:
+            self.elapsed = time.perf_counter() - self._t0
+        self._write(dict(self.summary(), type="summary", ts=round(time.time(), 3)))
+
+_active = None
+_active_lock = threading.Lock()
+
+def start_run(name: str, spans: bool = RUN_LOG_SPANS) -> RunReport:
+    """計測を始める（前の実行が残っていれば置き換える）。spans なら span 1件ごとの行も書く"""
+    global _active
+    with _active_lock:
+        _active = RunReport(name, os.path.join(app_dir(), RUN_LOG_FILE), spans)
+        return _active
+
+def finish_run() -> RunReport | None:
+    """計測を終えて集計を書き出し、その RunReport を返す"""
+    global _active
+    with _active_lock:
+        report, _active = _active, None
+    if report:
+        report.finish()
+    return report
+
+def current_run() -> RunReport | None:
+    return _active
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    with span("parse", url=url) as sp: ... のように囲む。
+    sp は dict で、中で sp["bytes"] = n のように属性を足せる。
+    """
+    report = _active
+    if report is None:
+        yield attrs
+        return
+    strategy = getattr(_local, "strategy", None)
+    if strategy:
+        attrs["strategy"] = strategy
+    t0 = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        report.add_span(name, time.perf_counter() - t0, **attrs)
+
+def timed(name: str):
+    """関数全体を span で囲むデコレーター"""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+@contextmanager
+def strategy_scope(strategy: str):
+    """このスレッドの通信を、指定した戦略の分として数える"""
+    prev = getattr(_local, "strategy", None)
+    _local.strategy = strategy
+    try:
+        yield
+    finally:
+        _local.strategy = prev
+
+def count(key: str, n: int = 1, strategy: str | None = None):
+    """戦略ごとのカウンタ（probes / hits / misses / bytes）を増やす"""
+    report = _active
+    strategy = strategy or getattr(_local, "strategy", None)
+    if report and strategy:
+        report.count(strategy, key, n)
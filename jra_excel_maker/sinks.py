@@ -0,0 +1,205 @@
+"""出力先（Excel / CSV / JSON Lines / SQLite）
+
+どの出力先も add(key, rows, race_title, url) でレースを1件ずつ受け取り、
+close() で書き終えたファイルのパスの一覧を返す。Excel も出力先の1つにすぎないので、
+データだけ欲しいときは Excel を作らずに済む。
+
+    sinks = open_sinks(["csv", "sqlite"], "20251108_全レース", out_dir)
+    for sink in sinks:
+        sink.add(RaceKey("20251108", "東京", 11), rows, race_title, url)
+    paths = [p for sink in sinks for p in sink.close()]
+"""
+import csv, json, os, sqlite3, threading
+from typing import NamedTuple
+
+from .config import SQLITE_BULK_ROWS
+from .report import span
+
+FORMATS = ("xlsx", "csv", "jsonl", "sqlite")
+
+class RaceKey(NamedTuple):
+    date: str       # YYYYMMDD
+    venue: str      # 東京 など
+    race: int
+
+class Entry(NamedTuple):
+    """出馬表の1頭分（CSV の1行・SQLite の entries 1行）"""
+    date: str
+    venue: str
+    race: int
+    umaban: str
+    horse: str
+    jockey: str
+
+ENTRY_HEADERS = list(Entry._fields)
+
+def entries(key: RaceKey, rows) -> list:
+    """fetch_rows_and_meta の rows [(馬番, 馬名, 騎手), ...] を Entry にする"""
+    return [Entry(*key, umaban, horse, jockey) for umaban, horse, jockey in rows]
+
+def desktop_path(filename: str, out_dir: str | None = None) -> str:
+    """保存先のパス（既定はデスクトップ、out_dir 指定時はそのフォルダ）"""
+    desktop = out_dir or os.path.join(os.path.expanduser("~"), "デスクトップ")
+    os.makedirs(desktop, exist_ok=True)
+    return os.path.join(desktop, filename)
+
+class CsvSink:
+    """1頭1行で書き出す。Excel でそのまま開けるよう BOM 付き UTF-8"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._f = open(path, "w", encoding="utf-8-sig", newline="")
+        self._w = csv.writer(self._f)
+        self._w.writerow(ENTRY_HEADERS)
+
+    def add(self, key: RaceKey, rows, race_title: str = "", url: str | None = None, filename: str | None = None):
+        with self._lock:
+            self._w.writerows(entries(key, rows))
+
+    def close(self) -> list:
+        self._f.close()
+        return [self.path]
+
+class JsonlSink:
+    """
+    1レース1行で書き出す。既定では CSV と同じくファイルを作り直す。
+    resume=True（過去データ取り込みの再開用）なら既存ファイルに追記し、書かれている
+    レースは written に覚えておいて二重に書かない（中断後の再開で同じレースが来ても重複しない）。
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self._lock = threading.Lock()
+        self.written = set()
+        if resume and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                        self.written.add(RaceKey(rec["date"], rec["venue"], rec["race"]))
+                    except (ValueError, KeyError, TypeError):
+                        continue   # 中断時の書きかけの行
+        self._f = open(path, "a" if resume else "w", encoding="utf-8")
+
+    def add(self, key: RaceKey, rows, race_title: str = "", url: str | None = None, filename: str | None = None):
+        key = RaceKey(*key)
+        record = {
+            "date": key.date, "venue": key.venue, "race": key.race, "url": url, "race_title": race_title,
+            "rows": [{"umaban": u, "horse": h, "jockey": j} for u, h, j in rows],
+        }
+        with self._lock:
+            if key in self.written:
+                return
+            self._f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._f.flush()
+            self.written.add(key)
+
+    def close(self) -> list:
+        self._f.close()
+        return [self.path]
+
+class SqliteSink:
+    """
+    races（1レース1行）と entries（1頭1行）の2表に書く。
+    add() はメモリに溜めるだけで、SQLITE_BULK_ROWS 頭分たまるごとに
+    1トランザクションの executemany でまとめて入れる。
+    同じレースをもう一度入れた場合は置き換える。
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS races (
+            date TEXT NOT NULL, venue TEXT NOT NULL, race INTEGER NOT NULL,
+            url TEXT, race_title TEXT,
+            PRIMARY KEY (date, venue, race)
+        );
+        CREATE TABLE IF NOT EXISTS entries (
+            date TEXT NOT NULL, venue TEXT NOT NULL, race INTEGER NOT NULL,
+            umaban TEXT, horse TEXT, jockey TEXT
+        );
+        CREATE INDEX IF NOT EXISTS entries_race ON entries (date, venue, race);
+    """
+
+    def __init__(self, path: str, bulk_rows: int = SQLITE_BULK_ROWS):
+        self.path = path
+        self.bulk_rows = bulk_rows
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(self.SCHEMA)
+        self._races = []
+        self._entries = []
+
+    def add(self, key: RaceKey, rows, race_title: str = "", url: str | None = None, filename: str | None = None):
+        key = RaceKey(*key)
+        with self._lock:
+            self._races.append((*key, url, race_title))
+            self._entries.extend(entries(key, rows))
+            if len(self._entries) >= self.bulk_rows:
+                self._flush()
+
+    def _flush(self):
+        if not self._races:
+            return
+        with span("sqlite.insert", rows=len(self._entries)), self._conn:
+            self._conn.executemany("DELETE FROM entries WHERE date = ? AND venue = ? AND race = ?",
+                                   [r[:3] for r in self._races])
+            self._conn.executemany("INSERT OR REPLACE INTO races VALUES (?, ?, ?, ?, ?)", self._races)
+            self._conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?)", self._entries)
+        self._races, self._entries = [], []
+
+    def close(self) -> list:
+        with self._lock:
+            self._flush()
+            self._conn.close()
+        return [self.path]
+
+class ExcelSink:
+    """
+    既存の Excel 出力。per_race_files なら1レース1ファイル（名前は filename）を
+    その場で保存し、そうでなければ close() でレース順に並べて1ブックにシートごと書き出す。
+    """
+
+    def __init__(self, filename: str, out_dir: str | None = None, per_race_files: bool = False):
+        # openpyxl は Excel を作る時だけ読み込む
+        from . import excel
+        self._excel = excel
+        self.filename = filename
+        self.out_dir = out_dir
+        self.per_race_files = per_race_files
+        self.paths = []
+        self._cards = []
+
+    def add(self, key: RaceKey, rows, race_title: str = "", url: str | None = None, filename: str | None = None):
+        if self.per_race_files:
+            name = filename or f"{key[0]}_{key[1]}{key[2]}R.xlsx"
+            self.paths.append(self._excel.save_to_desktop(rows, name, race_title, self.out_dir, url))
+        else:
+            self._cards.append((RaceKey(*key), rows, race_title, url))
+
+    def close(self) -> list:
+        if not self._cards:
+            return self.paths
+        self._cards.sort(key=lambda c: c[0])
+        multi_day = len({c[0].date for c in self._cards}) > 1
+        # シートは1枚ずつ書き込み専用ブックへ流し込む
+        sheets = ((f"{ymd[4:]}{place}{rno}R" if multi_day else f"{place}{rno}R", rows, title, url)
+                  for (ymd, place, rno), rows, title, url in self._cards)
+        self.paths.append(self._excel.save_batch_to_desktop(sheets, self.filename, self.out_dir))
+        self._cards = []
+        return self.paths
+
+def open_sinks(formats, basename: str, out_dir: str | None = None, per_race_files: bool = False) -> list:
+    """formats（"xlsx" / "csv" / "jsonl" / "sqlite"）ごとの出力先を作る。ファイル名は basename + 拡張子"""
+    sinks = []
+    for fmt in dict.fromkeys(formats):
+        if fmt == "xlsx":
+            sinks.append(ExcelSink(basename + ".xlsx", out_dir, per_race_files))
+        elif fmt == "csv":
+            sinks.append(CsvSink(desktop_path(basename + ".csv", out_dir)))
+        elif fmt == "jsonl":
+            sinks.append(JsonlSink(desktop_path(basename + ".jsonl", out_dir)))
+        elif fmt == "sqlite":
+            sinks.append(SqliteSink(desktop_path(basename + ".sqlite3", out_dir)))
+        else:
+            raise ValueError(f"未対応の出力形式です: {fmt}（{' / '.join(FORMATS)}）")
+    return sinks
@@ -0,0 +1,198 @@
+"""監視モード（出馬表の公開・変更をポーリングで待ち、Excelを作成・更新する）"""
+import os, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import BATCH_WORKERS, WATCH_MIN_INTERVAL, WATCH_MAX_INTERVAL, WATCH_BACKOFF
+from .discovery import fetch_race_card, get_race_index
+from .parse import fetch_rows_and_meta
+from .sinks import desktop_path
+
+def existing_card_hash(path: str, url: str) -> str | None:
+    """path が url の出馬表として作成済みなら _meta のハッシュを返す（違うファイル・開けなければ None）"""
+    from openpyxl import load_workbook
+    from .refresh import read_meta
+
+    try:
+        wb = load_workbook(path, read_only=True)
+    except Exception:
+        return None
+    try:
+        for entry in read_meta(wb):
+            if entry["url"] == url:
+                return entry["hash"] or ""
+    finally:
+        wb.close()
+    return None
+
+def unused_path(path: str) -> str:
+    """path が使われていれば「名前 (2).xlsx」のように空いている名前を返す"""
+    base, ext = os.path.splitext(path)
+    n = 2
+    while os.path.exists(path):
+        path = f"{base} ({n}){ext}"
+        n += 1
+    return path
+
+class WatchTarget:
+    """監視する1レース。公開されるまでは url / path が None"""
+
+    def __init__(self, yyyymmdd: str, place: str, race_no: int):
+        self.ymd = yyyymmdd
+        self.place = place
+        self.race_no = int(race_no)
+        self.url = None
+        self.path = None
+        self.hash = None        # 最後に書き込んだ (馬番, 馬名, 騎手) のハッシュ
+        self.interval = 0.0
+        self.due = 0.0          # 次に確認する時刻（time.monotonic）
+        self.checks = 0
+        self.changes = 0
+
+    @property
+    def label(self) -> str:
+        return f"{self.ymd} {self.place}{self.race_no}R"
+
+class Watcher:
+    """
+    複数レースをまとめて監視する。
+    未公開のレースは開催日ごとの一覧ページ（条件付きGET）で公開を待ち、
+    公開済みのレースは出馬表ページを条件付きGETで確認して差分だけ書き込む。
+    セッション・流量制御・キャッシュは全経路で共有しているので、1周のリクエストは
+    「開催日ごとの一覧 + 確認時刻が来た公開済みレース」だけで済む。
+    変化がなければ確認間隔を backoff 倍ずつ延ばし、変化があれば最短に戻す。
+    """
+
+    def __init__(self, targets, out_dir: str | None = None, status_cb=None, debug_log=None, on_event=None,
+                 workers: int = BATCH_WORKERS, min_interval: float = WATCH_MIN_INTERVAL,
+                 max_interval: float = WATCH_MAX_INTERVAL, backoff: float = WATCH_BACKOFF):
+        self.targets = [t if isinstance(t, WatchTarget) else WatchTarget(*t) for t in targets]
+        self.out_dir = out_dir
+        self.status_cb = status_cb
+        self.debug_log = debug_log
+        self.on_event = on_event
+        self.workers = max(1, workers)
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.backoff = backoff
+        self.events = []        # (時刻, レース, 種別, 内容)
+
+    def _log(self, msg):
+        if self.debug_log:
+            self.debug_log(msg)
+
+    def _emit(self, target: WatchTarget, kind: str, detail: str):
+        self.events.append((time.strftime("%H:%M:%S"), target.label, kind, detail))
+        self._log(f"【{kind}】{target.label}: {detail}")
+        if self.on_event:
+            self.on_event(target, kind, detail)
+
+    def _schedule(self, target: WatchTarget, changed: bool):
+        if changed or not target.interval:
+            target.interval = self.min_interval
+        else:
+            target.interval = min(self.max_interval, target.interval * self.backoff)
+        target.due = time.monotonic() + target.interval
+
+    def _check_pending(self, target: WatchTarget) -> bool:
+        from .excel import save_to_desktop, rows_hash
+
+        index = get_race_index()
+        url = index.lookup(target.ymd, target.place, target.race_no)
+        if url:
+            card = fetch_rows_and_meta(url, None, self.debug_log)
+        elif not index.has_date(target.ymd):
+            # 一覧に開催日ごと載っていないときだけ推測で探す（外れは URL キャッシュが一定時間覚える）
+            card = fetch_race_card(target.ymd, target.place, target.race_no, debug_log=self.debug_log)
+        else:
+            card = None
+        if not card:
+            return False
+        rows, filename, race_title, used_url = card
+        target.url = used_url
+        path = desktop_path(filename, self.out_dir)
+        digest = rows_hash(rows)
+        if os.path.exists(path):
+            existing = existing_card_hash(path, used_url)
+            if existing is not None:
+                # 前回の監視などで作成済み。評価・短評が書かれているかもしれないので作り直さず、差分だけ反映する
+                target.path, target.hash = path, existing
+                self._emit(target, "公開", f"{path}（作成済みのファイルを引き継ぎ）")
+                self._apply_changes(target, digest)
+                return True
+            # 同じ名前の別のファイル: 上書きしない
+            path = unused_path(path)
+        target.path = save_to_desktop(rows, os.path.basename(path), race_title, self.out_dir, used_url)
+        target.hash = digest
+        self._emit(target, "公開", target.path)
+        return True
+
+    def _check_published(self, target: WatchTarget) -> bool:
+        from .excel import rows_hash
+
+        # 304 なら前回の解析結果が返るだけ。内容が同じならブックを開かない
+        rows = fetch_rows_and_meta(target.url, None, self.debug_log)[0]
+        return self._apply_changes(target, rows_hash(rows))
+
+    def _apply_changes(self, target: WatchTarget, digest: str) -> bool:
+        """
+        内容（digest）が前回書き込んだものと違えばブックに差分を書き込む（評価・短評は残る）。
+        書き込めたときだけ target.hash を進めるので、失敗しても次の確認でやり直す。
+        """
+        from .refresh import refresh_workbook
+
+        if digest == target.hash:
+            return False
+        res = refresh_workbook(target.path, workers=1)
+        if res["failed"]:
+            raise RuntimeError(res["failed"][0][1])
+        target.hash = digest
+        if not res["changes"]:
+            return False
+        target.changes += len(res["changes"])
+        detail = "、".join(f"{c['umaban']}番{c['change']}" for c in res["changes"])
+        self._emit(target, "変更", detail)
+        return True
+
+    def _check(self, target: WatchTarget) -> bool:
+        target.checks += 1
+        return self._check_published(target) if target.path else self._check_pending(target)
+
+    def tick(self, pool: ThreadPoolExecutor) -> int:
+        """確認時刻が来たレースを確認する。確認したレース数を返す"""
+        now = time.monotonic()
+        due = [t for t in self.targets if t.due <= now]
+        if not due:
+            return 0
+        # 未公開のレースがある開催日は、一覧ページを1日1回ずつ取り直す（304なら本文なし）
+        index = get_race_index()
+        for ymd in sorted({t.ymd for t in due if not t.path}):
+            index.ensure_fresh(ymd, self.debug_log, max_age=self.min_interval / 2)
+
+        futures = {pool.submit(self._check, t): t for t in due}
+        for fut, target in futures.items():
+            try:
+                changed = fut.result()
+            except Exception as e:
+                changed = False
+                self._log(f"✗ {target.label}: {e}")
+            self._schedule(target, changed)
+        return len(due)
+
+    def status_text(self) -> str:
+        published = sum(1 for t in self.targets if t.path)
+        wait = max(0, min(t.due for t in self.targets) - time.monotonic())
+        return f"監視中: 公開 {published}/{len(self.targets)}レース / 次の確認まで {wait:.0f}秒"
+
+    def run(self, stop: threading.Event | None = None, until: float | None = None):
+        """stop がセットされるか、until（time.time）を過ぎるまで監視を続ける"""
+        stop = stop or threading.Event()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="watch") as pool:
+            while not stop.is_set() and (until is None or time.time() < until):
+                self.tick(pool)
+                if self.status_cb:
+                    self.status_cb(self.status_text())
+                wait = min(t.due for t in self.targets) - time.monotonic()
+                if until is not None:
+                    wait = min(wait, until - time.time())
+                stop.wait(max(0.5, wait))
+        return self.events